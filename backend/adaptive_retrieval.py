@@ -0,0 +1,101 @@
+import os
+import json
+from typing import List, Dict, Any
+
+from config import RETRIEVAL_CONFIG
+
+THRESHOLD_KEYS = ("confident_distance", "flat_spread", "web_search_distance")
+
+
+def thresholds_path() -> str:
+    path = RETRIEVAL_CONFIG["thresholds_file"]
+    if not os.path.isabs(path):
+        path = os.path.join(os.path.dirname(__file__), path)
+    return path
+
+
+def load_thresholds() -> Dict[str, float]:
+    """Cargar umbrales calibrados, usando los de config como respaldo"""
+    thresholds = {key: RETRIEVAL_CONFIG[key] for key in THRESHOLD_KEYS}
+    path = thresholds_path()
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                calibrated = json.load(f)
+            thresholds.update({key: float(calibrated[key]) for key in THRESHOLD_KEYS if key in calibrated})
+        except Exception as e:
+            print(f"Error cargando umbrales de recuperación: {e}")
+    return thresholds
+
+
+def save_thresholds(thresholds: Dict[str, Any]):
+    with open(thresholds_path(), 'w', encoding='utf-8') as f:
+        json.dump(thresholds, f, indent=2)
+
+
+def best_distance(chunks: List[Dict[str, Any]]) -> float:
+    if not chunks:
+        return float('inf')
+    return min(chunk.get('distance', float('inf')) for chunk in chunks)
+
+
+def is_confident(chunks: List[Dict[str, Any]], thresholds: Dict[str, float]) -> bool:
+    """El mejor resultado es suficientemente cercano como para no seguir buscando"""
+    return best_distance(chunks) <= thresholds["confident_distance"]
+
+
+def is_flat(chunks: List[Dict[str, Any]], thresholds: Dict[str, float]) -> bool:
+    """Las distancias no distinguen un ganador claro entre los candidatos"""
+    if len(chunks) < 2:
+        return False
+    distances = [chunk.get('distance', 0) for chunk in chunks]
+    return max(distances) - min(distances) <= thresholds["flat_spread"]
+
+
+def needs_web_search(chunks: List[Dict[str, Any]], thresholds: Dict[str, float]) -> bool:
+    """Buscar en la web solo si ningún chunk local está cerca de la pregunta"""
+    return best_distance(chunks) > thresholds["web_search_distance"]
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def compute_thresholds(labeled_results: List[Dict[str, Any]], target_precision: float = 0.9) -> Dict[str, float]:
+    """Calcular umbrales a partir de resultados etiquetados del dataset de evaluación.
+
+    Cada elemento tiene 'distances' (ordenadas de menor a mayor) y 'relevant'
+    (lista de bool con la misma longitud).
+    """
+    pairs = sorted((d, r) for item in labeled_results
+                   for d, r in zip(item['distances'], item['relevant']))
+    if not pairs:
+        return {key: RETRIEVAL_CONFIG[key] for key in THRESHOLD_KEYS}
+
+    # Confianza: mayor distancia hasta la que la precisión acumulada se mantiene
+    confident = RETRIEVAL_CONFIG["confident_distance"]
+    hits = 0
+    for i, (distance, relevant) in enumerate(pairs, 1):
+        hits += int(relevant)
+        if hits / i >= target_precision:
+            confident = distance
+
+    # Web: por encima de casi todas las distancias de top hits relevantes
+    relevant_tops = [item['distances'][0] for item in labeled_results
+                     if item['distances'] and any(item['relevant'])]
+    web = _percentile(relevant_tops, 0.9) if relevant_tops else RETRIEVAL_CONFIG["web_search_distance"]
+
+    # Planitud: spread típico cuando el top hit no es relevante, medido como en is_flat
+    # sobre los primeros initial_n_results (los que se miran antes de ampliar la búsqueda)
+    window = RETRIEVAL_CONFIG["initial_n_results"]
+    flat_spreads = [max(item['distances'][:window]) - min(item['distances'][:window]) for item in labeled_results
+                    if len(item['distances']) > 1 and not item['relevant'][0]]
+    flat = _percentile(flat_spreads, 0.5) if flat_spreads else RETRIEVAL_CONFIG["flat_spread"]
+
+    return {
+        "confident_distance": round(min(confident, web), 4),
+        "flat_spread": round(flat, 4),
+        "web_search_distance": round(max(web, confident), 4)
+    }
@@ -0,0 +1,122 @@
+import math
+import threading
+import time
+from collections import deque
+from typing import Dict, Any
+
+from config import ADMISSION_CONFIG
+
+
+class AdmissionRejected(Exception):
+    """Request rechazado por el control de admisión (se responde con Retry-After)"""
+
+    def __init__(self, status: int, reason: str, retry_after_s: int):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after_s = retry_after_s
+
+
+class Ticket:
+    """Lugar ocupado en la generación; se libera al salir del with o con release()"""
+
+    def __init__(self, controller: 'AdmissionController', wait_s: float):
+        self.controller = controller
+        self.wait_s = wait_s
+        self.started_at = time.time()
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.controller._release(time.time() - self.started_at)
+
+    def __enter__(self) -> 'Ticket':
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class AdmissionController:
+    """Cola acotada (FIFO) delante de la generación.
+
+    Como máximo max_concurrent requests generan a la vez; el resto espera en
+    orden hasta max_queue_wait_s. Si la cola está llena o la espera estimada
+    excede el límite se rechaza enseguida, para proteger la latencia de los
+    requests ya admitidos.
+    """
+
+    def __init__(self, config: Dict[str, Any] = None):
+        self.config = {**ADMISSION_CONFIG, **(config or {})}
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._in_flight = 0
+        self._service_s = self.config["initial_service_s"]
+        self._waits = deque(maxlen=self.config["stats_window"])
+        self._counters = {'admitted': 0, 'rejected_full': 0, 'rejected_timeout': 0}
+
+    def _retry_after(self, position: int) -> int:
+        """Segundos estimados hasta que se libere lugar para la posición dada de la cola"""
+        return max(1, math.ceil(self._service_s * (position + 1) / self.config["max_concurrent"]))
+
+    def acquire(self, max_wait_s: float = None) -> Ticket:
+        """Esperar un lugar; lanza AdmissionRejected (429 cola llena, 503 espera agotada)"""
+        max_wait_s = self.config["max_queue_wait_s"] if max_wait_s is None else min(max_wait_s, self.config["max_queue_wait_s"])
+        start = time.time()
+        with self._cond:
+            if self._in_flight < self.config["max_concurrent"] and not self._queue:
+                return self._admit(start)
+
+            position = len(self._queue)
+            if position >= self.config["max_queue"]:
+                self._counters['rejected_full'] += 1
+                raise AdmissionRejected(429, 'Cola de generación llena', self._retry_after(position))
+            # Shedding temprano: si la espera estimada no entra en el límite, no encolar
+            estimated = self._service_s * (position + 1) / self.config["max_concurrent"]
+            if max_wait_s <= 0 or estimated > max_wait_s * self.config["shed_factor"]:
+                self._counters['rejected_timeout'] += 1
+                raise AdmissionRejected(503, 'Espera estimada mayor que el límite', self._retry_after(position))
+
+            marker = object()
+            self._queue.append(marker)
+            admitted = self._cond.wait_for(
+                lambda: self._queue[0] is marker and self._in_flight < self.config["max_concurrent"],
+                max_wait_s
+            )
+            self._queue.remove(marker)
+            if not admitted:
+                self._counters['rejected_timeout'] += 1
+                self._cond.notify_all()
+                raise AdmissionRejected(503, 'Tiempo de espera en cola agotado', self._retry_after(len(self._queue)))
+            ticket = self._admit(start)
+            # El siguiente de la cola puede tener lugar si el límite es mayor que 1
+            self._cond.notify_all()
+            return ticket
+
+    def _admit(self, start: float) -> Ticket:
+        wait_s = time.time() - start
+        self._in_flight += 1
+        self._counters['admitted'] += 1
+        self._waits.append(wait_s)
+        return Ticket(self, wait_s)
+
+    def _release(self, service_s: float):
+        with self._cond:
+            self._in_flight = max(0, self._in_flight - 1)
+            self._service_s += self.config["ema_alpha"] * (service_s - self._service_s)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            waits = sorted(self._waits)
+            return {
+                'max_concurrent': self.config["max_concurrent"],
+                'in_flight': self._in_flight,
+                'queue_depth': len(self._queue),
+                'max_queue': self.config["max_queue"],
+                'avg_service_s': round(self._service_s, 3),
+                'avg_wait_ms': round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+                'p95_wait_ms': round(waits[min(len(waits) - 1, int(0.95 * len(waits)))] * 1000, 1) if waits else 0.0,
+                **self._counters
+            }
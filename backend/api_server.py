@@ -4,14 +4,15 @@ Servidor API para CodeHelperNET con Ollama
 Expone el chatbot RAG como una API REST
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 import sys
 import os
+import json
+import itertools
 import logging
 from datetime import datetime
 from dotenv import load_dotenv
-import requests
 
 # Cargar variables de entorno
 load_dotenv('config.env')
@@ -21,6 +22,10 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # Importar el chatbot
 from rag_chatbot import RAGChatbot
+from deadline import Deadline
+from ollama_client import get_ollama_client
+from admission_control import AdmissionRejected
+from config import DEADLINE_CONFIG, OLLAMA_CONFIG
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -34,17 +39,19 @@ chatbot = None
 
 def check_ollama_status():
     """Verificar el estado de Ollama"""
+    client = get_ollama_client()
     try:
-        response = requests.get("http://localhost:11434/api/tags", timeout=5)
+        response = client.get("/api/tags", timeout=5)
         if response.status_code == 200:
             models = response.json().get('models', [])
             return {
                 'status': 'running',
                 'models': [model['name'] for model in models],
-                'model_count': len(models)
+                'model_count': len(models),
+                'endpoints': client.stats()
             }
         else:
-            return {'status': 'error', 'message': f'HTTP {response.status_code}'}
+            return {'status': 'error', 'message': f'HTTP {response.status_code}', 'endpoints': client.stats()}
     except Exception as e:
         return {'status': 'error', 'message': str(e)}
 
@@ -70,47 +77,100 @@ def health_check():
         'timestamp': datetime.now().isoformat(),
         'chatbot_ready': chatbot is not None,
         'ollama': ollama_status,
+        'ollama_circuit': chatbot.ollama.breaker.snapshot() if chatbot is not None else None,
         'version': '2.0.0',
         'backend': 'Ollama + RAG'
     })
 
+def parse_chat_request():
+    """Validar el cuerpo de /chat y /chat/stream.
+
+    Devuelve (mensaje, modo, session_id, None) o (None, None, None, respuesta de error).
+    """
+    # Verificar que el chatbot esté inicializado
+    if chatbot is None:
+        return None, None, None, (jsonify({
+            'error': 'Chatbot no inicializado',
+            'message': 'El servidor está iniciando, por favor espera un momento.'
+        }), 503)
+
+    # Obtener el mensaje del request
+    data = request.get_json()
+    if not data or 'message' not in data:
+        return None, None, None, (jsonify({
+            'error': 'Mensaje requerido',
+            'message': 'Debes enviar un mensaje en el campo "message"'
+        }), 400)
+
+    user_message = data['message'].strip()
+    if not user_message:
+        return None, None, None, (jsonify({
+            'error': 'Mensaje vacío',
+            'message': 'El mensaje no puede estar vacío'
+        }), 400)
+
+    mode = data.get('mode')
+    if mode not in (None, 'generative', 'extractive'):
+        return None, None, None, (jsonify({
+            'error': 'Modo inválido',
+            'message': 'El campo "mode" debe ser "generative" o "extractive"'
+        }), 400)
+
+    session_id = data.get('session_id')
+    if session_id is not None and (not isinstance(session_id, str) or len(session_id) > 128):
+        return None, None, None, (jsonify({
+            'error': 'Sesión inválida',
+            'message': 'El campo "session_id" debe ser un texto de hasta 128 caracteres'
+        }), 400)
+
+    return user_message, mode, session_id, None
+
+def rejected_response(e: AdmissionRejected):
+    """Respuesta 429/503 (cola de generación) o 409 (sesión ocupada) con Retry-After"""
+    logger.warning(f"Request rechazado ({e.status}): {e.reason}")
+    response = jsonify({
+        'error': 'Sesión ocupada' if e.status == 409 else 'Servidor ocupado',
+        'message': e.reason,
+        'retry_after_s': e.retry_after_s
+    })
+    response.headers['Retry-After'] = str(e.retry_after_s)
+    return response, e.status
+
 @app.route('/chat', methods=['POST'])
 def chat():
     """Endpoint principal para el chat"""
     try:
-        # Verificar que el chatbot esté inicializado
-        if chatbot is None:
-            return jsonify({
-                'error': 'Chatbot no inicializado',
-                'message': 'El servidor está iniciando, por favor espera un momento.'
-            }), 503
-
-        # Obtener el mensaje del request
-        data = request.get_json()
-        if not data or 'message' not in data:
-            return jsonify({
-                'error': 'Mensaje requerido',
-                'message': 'Debes enviar un mensaje en el campo "message"'
-            }), 400
-
-        user_message = data['message'].strip()
-        if not user_message:
-            return jsonify({
-                'error': 'Mensaje vacío',
-                'message': 'El mensaje no puede estar vacío'
-            }), 400
+        user_message, mode, session_id, error = parse_chat_request()
+        if error:
+            return error
 
         logger.info(f"Mensaje recibido: {user_message[:100]}...")
 
-        # Procesar el mensaje con el chatbot
-        response = chatbot.chat(user_message)
+        # Presupuesto de tiempo del request (header en ms o valor por defecto)
+        deadline = Deadline.from_header(request.headers.get(DEADLINE_CONFIG["header"]))
+
+        # Procesar el mensaje con el chatbot (la cola de generación se pide solo si va a Ollama)
+        try:
+            result = chatbot.chat_with_details(user_message, mode, deadline, session_id)
+        except AdmissionRejected as e:
+            return rejected_response(e)
+        response = result['response']
         
         logger.info(f"Respuesta generada: {len(response)} caracteres")
 
         return jsonify({
             'response': response,
+            'fast_path': result['fast_path'],
+            'question_type': result['question_type'],
+            'mode': result['mode'],
+            'degraded': result.get('degraded', False),
+            'coalesced': result.get('coalesced', False),
+            'enrichment': result.get('enrichment'),
+            'session_id': session_id,
+            'queue_ms': result['timings'].get('queue_ms', 0),
+            'elapsed_ms': round(deadline.elapsed() * 1000),
             'timestamp': datetime.now().isoformat(),
-            'backend': 'Ollama + RAG'
+            'backend': 'FAQ' if result['fast_path'] else 'Ollama + RAG'
         })
 
     except Exception as e:
@@ -121,6 +181,49 @@ def chat():
             'details': str(e)
         }), 500
 
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """Endpoint de chat con Server-Sent Events: metadatos primero y luego tokens"""
+    user_message, mode, session_id, error = parse_chat_request()
+    if error:
+        return error
+
+    logger.info(f"Mensaje recibido (stream): {user_message[:100]}...")
+    deadline = Deadline.from_header(request.headers.get(DEADLINE_CONFIG["header"]))
+
+    # El primer evento (metadatos) se pide antes de responder: si la cola de
+    # generación rechaza el request todavía se puede devolver 429/503
+    events = chatbot.chat_stream(user_message, mode, deadline, session_id)
+    try:
+        first = next(events)
+    except AdmissionRejected as e:
+        return rejected_response(e)
+    except Exception as e:
+        logger.error(f"Error en streaming: {e}")
+        return jsonify({
+            'error': 'Error interno del servidor',
+            'message': 'Ocurrió un error procesando tu mensaje. Por favor, intenta de nuevo.',
+            'details': str(e)
+        }), 500
+
+    def generate():
+        try:
+            for event in itertools.chain([first], events):
+                yield f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            logger.error(f"Error en streaming: {e}")
+            error_event = {'type': 'error', 'message': str(e)}
+            yield f"event: error\ndata: {json.dumps(error_event, ensure_ascii=False)}\n\n"
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # Cerrar el stream del chatbot (y liberar su lugar en la cola) si el cliente
+    # se desconecta antes de empezar a leer
+    response.call_on_close(events.close)
+    return response
+
 @app.route('/ollama/status', methods=['GET'])
 def ollama_status():
     """Endpoint para verificar el estado de Ollama"""
@@ -131,7 +234,7 @@ def ollama_status():
 def ollama_models():
     """Endpoint para listar modelos disponibles"""
     try:
-        response = requests.get("http://localhost:11434/api/tags", timeout=5)
+        response = get_ollama_client().get("/api/tags", timeout=5)
         if response.status_code == 200:
             models = response.json().get('models', [])
             return jsonify({
@@ -177,7 +280,34 @@ def get_info():
             'Microservices',
             'DevOps'
         ],
-        'documents_count': len(chatbot.collection.get()['documents']) if hasattr(chatbot, 'collection') else 0
+        'documents_count': len(chatbot.collection.get()['documents']) if hasattr(chatbot, 'collection') else 0,
+        'speculation': chatbot.scheduler.stats(),
+        'coalescing': chatbot.single_flight.stats(),
+        'admission': chatbot.admission.stats(),
+        'web_cache': chatbot.web_searcher.cache.stats() if chatbot.web_searcher.cache else None,
+        'web_enrichment': chatbot.enricher.stats(),
+        'models': chatbot.ollama.router.stats(),
+        'throughput': chatbot.ollama.telemetry.stats()
+    })
+
+@app.route('/metrics/admission', methods=['GET'])
+def admission_metrics():
+    """Profundidad de la cola de generación, tiempos de espera y rechazos"""
+    if chatbot is None:
+        return jsonify({'error': 'Chatbot no inicializado'}), 503
+    return jsonify({
+        **chatbot.admission.stats(),
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/metrics/llm', methods=['GET'])
+def llm_metrics():
+    """Throughput de Ollama por modelo y por tipo de pregunta"""
+    if chatbot is None:
+        return jsonify({'error': 'Chatbot no inicializado'}), 503
+    return jsonify({
+        **chatbot.ollama.telemetry.stats(),
+        'timestamp': datetime.now().isoformat()
     })
 
 @app.route('/test', methods=['POST'])
@@ -192,7 +322,10 @@ def test_chat():
                 'error': 'Chatbot no inicializado'
             }), 503
 
-        response = chatbot.chat(test_message)
+        try:
+            response = chatbot.chat_with_details(test_message)['response']
+        except AdmissionRejected as e:
+            return rejected_response(e)
         
         return jsonify({
             'test_message': test_message,
@@ -236,6 +369,8 @@ if __name__ == '__main__':
     ollama_status = check_ollama_status()
     if ollama_status['status'] == 'running':
         logger.info(f"Ollama está ejecutándose con {ollama_status['model_count']} modelos")
+        if OLLAMA_CONFIG["warm_up"]:
+            chatbot.ollama.warm_up()
     else:
         logger.warning(f"Ollama no está disponible: {ollama_status['message']}")
 
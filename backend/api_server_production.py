@@ -3,6 +3,7 @@ import logging
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from rag_chatbot import RAGChatbot
+from admission_control import AdmissionRejected
 import traceback
 
 # Configurar logging
@@ -77,7 +78,18 @@ def chat():
         logger.info(f"Mensaje recibido: {message[:50]}...")
         
         # Procesar mensaje con el chatbot
-        response = chatbot.chat(message)
+        try:
+            response = chatbot.chat_with_details(message)['response']
+        except AdmissionRejected as e:
+            # Cola de generación llena o espera agotada: 429/503 con Retry-After
+            logger.warning(f"Request rechazado ({e.status}): {e.reason}")
+            rejected = jsonify({
+                "error": "Sesión ocupada" if e.status == 409 else "Servidor ocupado",
+                "message": e.reason,
+                "retry_after_s": e.retry_after_s
+            })
+            rejected.headers['Retry-After'] = str(e.retry_after_s)
+            return rejected, e.status
         
         logger.info(f"Respuesta generada: {len(response)} caracteres")
         
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark de reutilización del prefijo del prompt en Ollama
+Compara prompt_eval_count/prompt_eval_duration entre el formato anterior
+(contexto antes de las instrucciones) y el formato con prefijo fijo primero
+"""
+
+from rag_chatbot import OllamaLLM, PROMPT_PREFIX
+
+QUESTIONS = [
+    ("¿Cómo declarar una variable en C#?", "En C# las variables se declaran con su tipo: int edad = 30;"),
+    ("Explica qué es un array en C#", "Un array es una colección de tamaño fijo: int[] numeros = new int[5];"),
+    ("¿Cómo usar Console.WriteLine?", "Console.WriteLine escribe una línea en la salida estándar."),
+]
+
+
+def legacy_prompt(question: str, context: str) -> str:
+    """Formato anterior: el contexto variable aparecía antes de las instrucciones"""
+    instructions = PROMPT_PREFIX.split("\n\n", 1)[1]
+    return f"""Eres un experto especializado en C# y .NET. Responde la siguiente pregunta de manera específica, clara y útil.
+
+Contexto disponible:
+{context}
+
+Pregunta: {question}
+
+{instructions}
+Respuesta:"""
+
+
+def measure(llm: OllamaLLM, prompt: str) -> dict:
+    response = llm.client.post("/api/generate", json={
+        "model": llm.model,
+        "prompt": prompt,
+        "stream": False,
+        "keep_alive": "30m",
+        "options": {"num_predict": 1}
+    }, timeout=120)
+    response.raise_for_status()
+    data = response.json()
+    return {
+        'prompt_eval_count': data.get('prompt_eval_count', 0),
+        'prompt_eval_ms': data.get('prompt_eval_duration', 0) / 1e6
+    }
+
+
+def run(llm: OllamaLLM, label: str, build):
+    print(f"\n📏 {label}")
+    total_ms = 0.0
+    for question, context in QUESTIONS:
+        result = measure(llm, build(question, context))
+        total_ms += result['prompt_eval_ms']
+        print(f"   {result['prompt_eval_count']:4d} tokens evaluados, {result['prompt_eval_ms']:8.1f} ms - {question}")
+    print(f"   Total prompt_eval: {total_ms:.1f} ms")
+
+
+def main():
+    llm = OllamaLLM()
+    print(f"🧪 Reutilización de prefijo con el modelo {llm.model}")
+    llm.warm_up()
+    run(llm, "Formato anterior (contexto primero)", legacy_prompt)
+    run(llm, "Prefijo fijo primero", llm.build_prompt)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark del camino de generación contra el servidor falso de Ollama
+Mide la latencia y el overhead propio (tiempo total menos total_duration del
+servidor, que incluye la espera en su cola cuando hay más clientes que
+concurrencia) con distintos niveles de concurrencia, de forma reproducible
+"""
+
+import argparse
+import statistics
+import threading
+import time
+
+from fake_ollama import FakeOllamaServer, use_fake
+
+
+def run_level(llm, clients: int, requests_per_client: int, stream: bool) -> dict:
+    latencies, overheads, ttfts = [], [], []
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(requests_per_client):
+            result = {}
+            start = time.time()
+            if stream:
+                first = None
+                for _token in llm.generate_stream("¿Cómo escribo Hola Mundo en C#?", result=result):
+                    if first is None:
+                        first = time.time() - start
+            else:
+                first = None
+                llm.generate_response("¿Cómo escribo Hola Mundo en C#?", result=result)
+            elapsed = time.time() - start
+            with lock:
+                latencies.append(elapsed)
+                if first is not None:
+                    ttfts.append(first)
+                if result.get('total_duration'):
+                    overheads.append(elapsed - result['total_duration'] / 1e9)
+
+    start = time.time()
+    threads = [threading.Thread(target=worker) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.time() - start
+
+    latencies.sort()
+    return {
+        'clients': clients,
+        'requests': len(latencies),
+        'throughput_rps': len(latencies) / wall,
+        'p50_s': statistics.median(latencies),
+        'p95_s': latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))],
+        'ttft_p50_s': statistics.median(ttfts) if ttfts else None,
+        'overhead_ms': statistics.mean(overheads) * 1000 if overheads else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de generación contra Ollama falso')
+    parser.add_argument('--levels', default='1,2,4,8', help='Clientes concurrentes por nivel')
+    parser.add_argument('--requests', type=int, default=5, help='Requests por cliente')
+    parser.add_argument('--ttft', type=float, default=0.2)
+    parser.add_argument('--tokens-per-s', type=float, default=100)
+    parser.add_argument('--concurrency', type=int, default=2, help='Concurrencia del servidor falso')
+    parser.add_argument('--stream', action='store_true')
+    args = parser.parse_args()
+
+    config = {'ttft_s': args.ttft, 'tokens_per_s': args.tokens_per_s, 'concurrency': args.concurrency}
+    with FakeOllamaServer(config, port=0) as server:
+        use_fake(server)
+        from rag_chatbot import OllamaLLM
+        llm = OllamaLLM()
+
+        print(f"🏁 Ollama falso: TTFT {args.ttft}s, {args.tokens_per_s} tokens/s, concurrencia {args.concurrency}")
+        print(f"{'clientes':>8} {'req':>5} {'req/s':>7} {'p50 s':>7} {'p95 s':>7} {'ttft s':>7} {'overhead ms':>12}")
+        for clients in [int(level) for level in args.levels.split(',')]:
+            stats = run_level(llm, clients, args.requests, args.stream)
+            ttft = f"{stats['ttft_p50_s']:.3f}" if stats['ttft_p50_s'] is not None else "-"
+            overhead = f"{stats['overhead_ms']:.1f}" if stats['overhead_ms'] is not None else "-"
+            print(f"{clients:>8} {stats['requests']:>5} {stats['throughput_rps']:>7.2f} {stats['p50_s']:>7.3f} "
+                  f"{stats['p95_s']:>7.3f} {ttft:>7} {overhead:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Any
+
+from config import CIRCUIT_BREAKER_CONFIG
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Circuit breaker para un backend lento o caído.
+
+    closed: los requests pasan y se mide la tasa de fallos y de llamadas lentas.
+    open: los requests fallan de inmediato; un hilo en segundo plano prueba el backend.
+    half_open: se deja pasar una cantidad limitada de requests de prueba.
+    """
+
+    def __init__(self, probe: Callable[[], bool], name: str = "ollama", config: Dict[str, Any] = None):
+        self.probe = probe
+        self.name = name
+        self.config = {**CIRCUIT_BREAKER_CONFIG, **(config or {})}
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._window = deque(maxlen=self.config["window_size"])  # (ok, lento)
+        self._opened_at = None
+        self._half_open_in_flight = 0
+        self._probe_thread = None
+        self._last_reason = None
+        self._rejected = 0
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Decidir si un request puede ir al backend"""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN:
+                if time.time() - self._opened_at >= self.config["open_duration_s"]:
+                    self._state = HALF_OPEN
+                    self._half_open_in_flight = 0
+                else:
+                    self._rejected += 1
+                    return False
+            # half_open: solo unas pocas llamadas de prueba a la vez
+            if self._half_open_in_flight < self.config["half_open_max_calls"]:
+                self._half_open_in_flight += 1
+                return True
+            self._rejected += 1
+            return False
+
+    def record_success(self, latency_s: float):
+        slow = latency_s >= self.config["slow_call_s"]
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+                if slow:
+                    self._open("llamada de prueba lenta")
+                else:
+                    self._close()
+                return
+            self._window.append((True, slow))
+            self._evaluate()
+
+    def record_failure(self):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+                self._open("falló la llamada de prueba")
+                return
+            self._window.append((False, False))
+            self._evaluate()
+
+    def record_cancelled(self):
+        """La llamada se abandonó sin resultado (cliente desconectado): no cuenta como éxito ni fallo"""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+
+    def _evaluate(self):
+        calls = len(self._window)
+        if calls < self.config["min_calls"]:
+            return
+        failures = sum(1 for ok, _ in self._window if not ok)
+        slow = sum(1 for _, is_slow in self._window if is_slow)
+        if failures / calls >= self.config["failure_rate_threshold"]:
+            self._open(f"tasa de fallos {failures}/{calls}")
+        elif slow / calls >= self.config["slow_call_rate_threshold"]:
+            self._open(f"tasa de llamadas lentas {slow}/{calls}")
+
+    def _open(self, reason: str):
+        print(f"⚠️  Circuito {self.name} abierto: {reason}")
+        self._state = OPEN
+        self._opened_at = time.time()
+        self._last_reason = reason
+        self._window.clear()
+        if self._probe_thread is None or not self._probe_thread.is_alive():
+            self._probe_thread = threading.Thread(target=self._probe_loop, daemon=True,
+                                                  name=f"{self.name}-circuit-probe")
+            self._probe_thread.start()
+
+    def _close(self):
+        print(f"✅ Circuito {self.name} cerrado")
+        self._state = CLOSED
+        self._opened_at = None
+        self._window.clear()
+
+    def _probe_loop(self):
+        """Probar el backend mientras el circuito esté abierto; si responde, pasar a half-open"""
+        while True:
+            time.sleep(self.config["probe_interval_s"])
+            with self._lock:
+                if self._state != OPEN:
+                    return
+            try:
+                healthy = self.probe()
+            except Exception:
+                healthy = False
+            if healthy:
+                with self._lock:
+                    if self._state == OPEN:
+                        self._state = HALF_OPEN
+                        self._half_open_in_flight = 0
+                return
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Estado para /health"""
+        with self._lock:
+            calls = len(self._window)
+            failures = sum(1 for ok, _ in self._window if not ok)
+            return {
+                'state': self._state,
+                'recent_calls': calls,
+                'recent_failures': failures,
+                'rejected': self._rejected,
+                'opened_at': self._opened_at,
+                'last_reason': self._last_reason
+            }
@@ -8,7 +8,67 @@ OLLAMA_CONFIG = {
     "num_predict": 500,
     "top_p": 0.9,
     "top_k": 40,
-    "timeout": 60
+    "timeout": 60,
+    "keep_alive": "30m",   # Mantener el modelo cargado entre requests
+    "warm_up": True,       # Precargar el modelo al iniciar el servidor
+    "pool_size": 16,       # Conexiones keep-alive (≈ concurrencia del servidor)
+    "connect_retries": 2,
+    # Pool de servidores de Ollama (vacío = solo "url"); también OLLAMA_URLS=http://a:11434,http://b:11434
+    "endpoints": []
+}
+
+# Balanceo entre endpoints de Ollama
+OLLAMA_POOL_CONFIG = {
+    "unhealthy_after": 2,      # Fallos de conexión seguidos para sacar un endpoint del pool
+    "retry_unhealthy_s": 15,   # Tiempo antes de volver a intentar con un endpoint caído
+    "models_refresh_s": 60     # Cada cuánto se consultan /api/tags y /api/ps por endpoint
+}
+
+# Control de admisión delante de la generación (api_server.py)
+ADMISSION_CONFIG = {
+    "enabled": True,
+    "max_concurrent": 4,       # Requests generando a la vez (≈ capacidad de los endpoints de Ollama)
+    "max_queue": 16,           # Requests esperando; más allá se responde 429
+    "max_queue_wait_s": 10,    # Espera máxima en cola; más allá se responde 503
+    "shed_factor": 1.5,        # Rechazar enseguida si la espera estimada supera max_queue_wait_s × factor
+    "initial_service_s": 8,    # Duración estimada de un request antes de medir
+    "ema_alpha": 0.2,
+    "stats_window": 500
+}
+
+# Coalescing de preguntas idénticas en curso (solo requests sin sesión)
+SINGLE_FLIGHT_CONFIG = {
+    "enabled": True,
+    "max_wait_s": 60    # Espera máxima de un duplicado por el resultado del primero
+}
+
+# Circuit breaker alrededor de Ollama
+CIRCUIT_BREAKER_CONFIG = {
+    "window_size": 20,               # Últimas llamadas consideradas
+    "min_calls": 5,
+    "failure_rate_threshold": 0.5,
+    "slow_call_s": 20,               # Una llamada más lenta que esto cuenta como lenta
+    "slow_call_rate_threshold": 0.8,
+    "open_duration_s": 30,           # Tiempo máximo en open antes de probar con tráfico real
+    "probe_interval_s": 5,           # Sondeo de /api/tags mientras está abierto
+    "half_open_max_calls": 1
+}
+
+# Servidor falso de Ollama (fake_ollama.py) para pruebas y benchmarks
+FAKE_OLLAMA_CONFIG = {
+    "host": "127.0.0.1",
+    "port": 11435,
+    "models": ["llama2", "mistral", "codellama"],
+    "ttft_s": 0.2,             # Tiempo hasta el primer token
+    "tokens_per_s": 50,
+    "load_s": 0.0,             # Carga simulada la primera vez que se usa cada modelo
+    "concurrency": 1,          # Requests generando a la vez (el resto espera en cola)
+    "error_rate": 0.0,         # Fracción de requests que responden 500
+    "seed": 42,
+    "verbose": False,
+    "default_response": "En C# puedes resolverlo así:\n\n```csharp\nConsole.WriteLine(\"Hola Mundo\");\n```\n\nEste ejemplo escribe un texto en la consola.",
+    # Fragmento del prompt -> respuesta predefinida
+    "canned": {}
 }
 
 # Configuración de la base de datos vectorial
@@ -20,10 +80,101 @@ VECTOR_DB_CONFIG = {
     "max_results": 5
 }
 
+# Recuperación adaptativa: profundidad y fallback web según las distancias
+RETRIEVAL_CONFIG = {
+    "initial_n_results": 3,
+    "max_n_results": 10,
+    # Valores por defecto; se sobreescriben con los calibrados en thresholds_file
+    "confident_distance": 0.6,     # Top hit por debajo de esto: no ampliar la búsqueda
+    "flat_spread": 0.05,           # Distancias "planas": ampliar n_results
+    "web_search_distance": 1.2,    # Mejor distancia por encima de esto: buscar en la web
+    "thresholds_file": "retrieval_thresholds.json"
+}
+
+# Configuración del re-ranking con cross-encoder
+RERANK_CONFIG = {
+    "enabled": True,
+    "budget_ms": 150,        # Presupuesto de latencia por request para re-ranking
+    "max_candidates": 8,     # Máximo de pares (pregunta, chunk) evaluados
+    "cache_size": 2048,      # Entradas del cache LRU (hash de pregunta, id de chunk) -> score
+    "max_chunk_chars": 1000  # Truncar chunks largos antes de puntuarlos
+}
+
+# Selección de contexto por relevancia marginal máxima (MMR)
+CONTEXT_SELECTION_CONFIG = {
+    "mmr_lambda": 0.7,     # 1.0 = solo relevancia, 0.0 = solo diversidad
+    "max_chunks": 3,
+    "token_budget": 750,   # Tokens máximos de contexto local seleccionado
+    "min_chunk_chars": 50  # Ignorar chunks sin contenido significativo
+}
+
+# Respuestas curadas servidas sin recuperación ni LLM (directorio de archivos .md)
+FAQ_CONFIG = {
+    "enabled": True,
+    "directory": "faq",
+    "threshold": 0.85,          # Similitud coseno mínima con alguna pregunta de ejemplo
+    "fallback_threshold": 0.6   # Umbral más permisivo cuando Ollama no respondió
+}
+
+# Respuestas extractivas (sin LLM) a partir del contexto recuperado
+EXTRACTIVE_CONFIG = {
+    "min_unit_chars": 25,     # Oraciones o bloques de código más cortos se descartan
+    "min_score": 0.25,        # Similitud mínima de una oración con la pregunta
+    "min_code_score": 0.2,
+    "max_key_points": 4,
+    "max_redundancy": 0.9,    # Similitud máxima entre puntos clave elegidos
+    "code_embed_chars": 300   # Caracteres de cada bloque de código que se codifican
+}
+
+# Presupuesto de tiempo de extremo a extremo por request
+DEADLINE_CONFIG = {
+    "header": "X-Request-Deadline-Ms",  # Presupuesto enviado por el cliente (ms)
+    "default_budget_s": 25,
+    "max_budget_s": 60,
+    "min_stage_timeout_s": 0.5,
+    "web_search_min_s": 8,          # Por debajo de esto no se busca en la web
+    "generation_reserve_s": 5,      # Tiempo que la búsqueda web debe dejar para generar
+    "min_generation_s": 3,          # Por debajo de esto se responde en modo extractivo
+    "estimated_tokens_per_s": 15,   # Para acortar num_predict según el tiempo restante
+    "min_num_predict": 64
+}
+
+# Ejecución especulativa de la búsqueda web en paralelo con la recuperación local
+SPECULATION_CONFIG = {
+    "enabled": True,
+    "max_workers": 4,
+    "min_samples": 5,      # Requests por tipo de pregunta antes de confiar en la tasa
+    "min_need_rate": 0.3   # Especular si la web fue necesaria al menos en esta fracción
+}
+
+# Búsqueda web fuera del camino crítico (responder primero, enriquecer después)
+WEB_ENRICHMENT_CONFIG = {
+    "answer_first": False,         # Responder con el contexto local y buscar en la web en segundo plano
+    "max_workers": 2,
+    "max_pending": 32,             # Búsquedas en segundo plano a la vez; más allá se omiten
+    "max_results": 3,
+    "queue_ingestion": True,       # Guardar las páginas nuevas para agregarlas al índice
+    "pending_ingestion_file": "pending_ingestion.jsonl"
+}
+
+# Sesiones de conversación (multi-turno) en memoria
+SESSION_CONFIG = {
+    "max_sessions": 1000,
+    "ttl_s": 1800,
+    "max_context_tokens": 2048,  # Tope del array 'context' de Ollama que se reutiliza
+    "max_history_turns": 4,
+    "history_token_cap": 400,    # Tokens de turnos previos cuando no hay contexto de Ollama
+    "topic_similarity": 0.55     # Similitud mínima para reutilizar la recuperación anterior
+}
+
 # Configuración de búsqueda web
 WEB_SEARCH_CONFIG = {
     "max_results": 3,
     "timeout": 10,
+    "fetch_workers": 4,    # Páginas de resultados descargadas en paralelo
+    "max_page_bytes": 512 * 1024,   # Se deja de descargar al llegar a este tamaño
+    "max_content_chars": 1000,      # Texto que se guarda por página
+    "html_parser": "auto",          # "auto" (lxml si está instalado), "lxml" o "html.parser"
     "preferred_sites": [
         "docs.microsoft.com",
         "learn.microsoft.com",
@@ -31,14 +182,84 @@ WEB_SEARCH_CONFIG = {
     ]
 }
 
+# Cache persistente de búsquedas y páginas web (SQLite)
+WEB_CACHE_CONFIG = {
+    "enabled": True,
+    "path": "web_cache.sqlite3",
+    "search_ttl_s": 86400,        # Resultados de DuckDuckGo
+    "page_ttl_s": 86400,          # Luego se revalida con ETag/Last-Modified
+    "max_bytes": 50 * 1024 * 1024,
+    "offline": False              # Solo responder desde el cache (también WEB_CACHE_OFFLINE=1)
+}
+
 # Configuración del chatbot
 CHATBOT_CONFIG = {
     "language": "es",  # "es" para español, "en" para inglés
     "max_context_length": 1000,
     "fallback_enabled": True,
+    "default_mode": "generative",  # "generative" (Ollama) o "extractive" (sin LLM)
     "web_search_enabled": True
 }
 
+# Presupuesto de tokens de contexto por tipo de pregunta (acotado por max_context_length)
+CONTEXT_TOKEN_BUDGETS = {
+    "loop_specific": 500,
+    "database_specific": 800,
+    "pattern_specific": 800,
+    "code_example": 1000,
+    "general_help": 600,
+    "min_piece_tokens": 40,          # No agregar recortes más pequeños que esto
+    "tokenizer_encoding": "cl100k_base"  # Codificación de tiktoken (aproximación del tokenizer del modelo)
+}
+
+# Clasificador de intención por embeddings (centroides de ejemplos etiquetados)
+INTENT_CONFIG = {
+    "min_similarity": 0.35,  # Por debajo de esto se usan las reglas de palabras clave
+    "tie_margin": 0.03,      # Diferencia mínima entre las dos mejores intenciones
+    "examples": {
+        "loop_specific": [
+            "¿Cómo crear un bucle for en C#?",
+            "Ejemplo de while en C#",
+            "¿Cómo recorrer una lista con foreach?",
+            "Diferencia entre do while y while",
+            "¿Cómo iterar un array en C#?",
+            "Contador con un ciclo en C#"
+        ],
+        "database_specific": [
+            "¿Cómo conectar a una base de datos SQL Server en C#?",
+            "¿Qué es Entity Framework Core?",
+            "Ejemplo de consulta con SqlCommand y SqlDataReader",
+            "¿Cómo usar migrations en EF Core?",
+            "¿Cómo insertar un registro en una tabla con ADO.NET?",
+            "¿Qué es un DataAdapter?"
+        ],
+        "pattern_specific": [
+            "Explica el patrón Singleton",
+            "¿Cómo implementar el patrón Repository?",
+            "¿Qué es el patrón Factory en C#?",
+            "Ejemplo del patrón Observer con eventos",
+            "¿Cuándo usar el patrón Strategy?",
+            "¿Qué son los patrones de diseño más comunes en .NET?"
+        ],
+        "code_example": [
+            "Muéstrame un ejemplo de código de una clase en C#",
+            "Dame un ejemplo de async await",
+            "¿Cómo implementar una API REST con ASP.NET Core?",
+            "Código de ejemplo para leer un archivo",
+            "Muéstrame un hola mundo en C#",
+            "¿Cómo crear una aplicación de consola?"
+        ],
+        "general_help": [
+            "¿Qué es .NET Core?",
+            "¿Cuál es la diferencia entre .NET Framework y .NET Core?",
+            "¿Qué es el Common Language Runtime?",
+            "Explica qué es la inyección de dependencias",
+            "¿Cuáles son las ventajas de C#?",
+            "¿Qué es el garbage collector?"
+        ]
+    }
+}
+
 # Modelos recomendados de Ollama para diferentes usos
 RECOMMENDED_MODELS = {
     "general": "llama2",           # Bueno para respuestas generales
@@ -48,6 +269,64 @@ RECOMMENDED_MODELS = {
     "latest": "llama2:latest"      # Última versión
 }
 
+# Perfiles de generación por tipo de pregunta (se combinan sobre OLLAMA_CONFIG y
+# MODEL_ROUTING_CONFIG["model_options"]; las claves del perfil tienen prioridad).
+# Los tipos que van al modelo de código no fijan temperature: usan la del modelo.
+GENERATION_PROFILES = {
+    "general_help": {"num_predict": 250, "temperature": 0.6},
+    "loop_specific": {"num_predict": 350, "temperature": 0.4},
+    "database_specific": {"num_predict": 500},
+    "pattern_specific": {"num_predict": 500},
+    "code_example": {"num_predict": 500}
+}
+
+# Secuencias de stop comunes: el modelo no debe continuar la conversación por su cuenta
+GENERATION_STOP = ["\nPregunta:", "\nUsuario:", "\nPregunta de seguimiento:"]
+
+# Telemetría de throughput de Ollama (prompt_eval_*, eval_*, load_duration, total_duration)
+LLM_TELEMETRY_CONFIG = {
+    "log_calls": True,                    # Una línea por llamada en la consola
+    "log_file": "llm_telemetry.jsonl",    # None para no guardar el detalle por llamada
+    "max_log_bytes": 5 * 1024 * 1024,     # Al superarlo el log pasa a .1 (se guarda uno solo)
+    "reload_threshold_ms": 500            # load_duration a partir del cual se cuenta una recarga del modelo
+}
+
+# Registro de longitudes reales para ajustar num_predict (python generation_profiles.py)
+GENERATION_FEEDBACK_CONFIG = {
+    "log_file": "generation_lengths.jsonl",
+    "max_log_bytes": 5 * 1024 * 1024,
+    "auto_tune": False,      # Usar el num_predict sugerido en vivo
+    "min_samples": 20,
+    "window": 200,
+    "percentile": 0.95,
+    "margin": 0.1,
+    "min_num_predict": 64,
+    "max_num_predict": 800
+}
+
+# Ruteo de modelos por request (roles de RECOMMENDED_MODELS)
+MODEL_ROUTING_CONFIG = {
+    "by_question_type": {
+        "code_example": "code",
+        "pattern_specific": "code",
+        "database_specific": "code",
+        "loop_specific": "general",
+        "general_help": "general"
+    },
+    "fast_role": "fast",             # Modelo al que se baja cuando el SLO peligra
+    "slo_ms": 30000,                 # Latencia objetivo de generación
+    "parallel_per_model": 1,         # Requests que Ollama atiende en paralelo por modelo
+    "initial_prompt_ms_per_token": 2,
+    "initial_eval_ms_per_token": 40,
+    "ema_alpha": 0.2,
+    # Opciones de generación por modelo (se combinan con las de OLLAMA_CONFIG)
+    "model_options": {
+        "codellama": {"temperature": 0.2},
+        "mistral": {"temperature": 0.6},
+        "llama2": {"temperature": 0.7}
+    }
+}
+
 # Prompts personalizados para diferentes tipos de preguntas
 CUSTOM_PROMPTS = {
     "code_example": """Eres un experto en C# y .NET. El usuario está pidiendo un ejemplo de código. Proporciona una respuesta clara y útil.
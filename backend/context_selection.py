@@ -0,0 +1,166 @@
+import re
+from functools import lru_cache
+from typing import List, Dict, Any
+
+import numpy as np
+
+from config import CONTEXT_SELECTION_CONFIG, CONTEXT_TOKEN_BUDGETS, CHATBOT_CONFIG
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding(CONTEXT_TOKEN_BUDGETS["tokenizer_encoding"])
+except Exception:
+    _encoding = None
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?:;])\s+|\n+')
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimación rápida de tokens (~4 caracteres por token)"""
+    return max(1, len(text) // 4)
+
+
+def _count_uncached(text: str) -> int:
+    if _encoding is None:
+        return estimate_tokens(text)
+    return len(_encoding.encode(text, disallowed_special=()))
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str) -> int:
+    """Contar tokens con tiktoken (o estimar si no está instalado)"""
+    return _count_uncached(text)
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def mmr_select(query_embedding, chunks: List[Dict[str, Any]],
+               mmr_lambda: float = None, max_chunks: int = None,
+               token_budget: int = None) -> List[Dict[str, Any]]:
+    """Seleccionar chunks con relevancia marginal máxima (MMR).
+
+    Usa los embeddings devueltos por Chroma junto con los resultados, así que
+    no se vuelve a codificar ningún chunk. Si hay chunks con score de
+    re-ranking se elige entre ellos usando ese score como relevancia; si no,
+    la similitud coseno con la pregunta.
+    """
+    config = CONTEXT_SELECTION_CONFIG
+    mmr_lambda = config["mmr_lambda"] if mmr_lambda is None else mmr_lambda
+    max_chunks = config["max_chunks"] if max_chunks is None else max_chunks
+    token_budget = config["token_budget"] if token_budget is None else token_budget
+
+    candidates = [c for c in chunks
+                  if len(c.get('content', '').strip()) > config["min_chunk_chars"]
+                  and c.get('embedding') is not None]
+    # El re-ranking solo puntúa los mejores candidatos (max_candidates o lo que
+    # alcanzó el presupuesto): si hay puntuados, la selección se hace entre ellos
+    scored = [c for c in candidates if 'rerank_score' in c]
+    if scored:
+        candidates = scored
+    if not candidates or query_embedding is None:
+        return []
+
+    embeddings = _normalize_rows(np.asarray([c['embedding'] for c in candidates], dtype=np.float32))
+    query = _normalize_rows(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1))[0]
+
+    if scored:
+        # Sigmoide de los logits del cross-encoder para llevarlos a [0, 1]
+        scores = np.asarray([c['rerank_score'] for c in candidates], dtype=np.float32)
+        relevance = 1.0 / (1.0 + np.exp(-scores))
+    else:
+        relevance = embeddings @ query
+
+    similarity = embeddings @ embeddings.T
+    tokens = np.asarray([count_tokens(c['content'].strip()) for c in candidates])
+
+    selected = []
+    available = np.ones(len(candidates), dtype=bool)
+    max_sim = np.zeros(len(candidates), dtype=np.float32)
+    used_tokens = 0
+
+    while len(selected) < max_chunks:
+        available &= (used_tokens + tokens) <= token_budget
+        if not available.any():
+            break
+        mmr = mmr_lambda * relevance - (1.0 - mmr_lambda) * max_sim
+        mmr[~available] = -np.inf
+        best = int(np.argmax(mmr))
+        selected.append(best)
+        available[best] = False
+        used_tokens += int(tokens[best])
+        max_sim = np.maximum(max_sim, similarity[best])
+
+    if not selected:
+        # Ningún chunk cabe en el presupuesto: conservar al menos el más relevante
+        selected.append(int(np.argmax(relevance)))
+
+    return [candidates[i] for i in selected]
+
+
+def trim_to_sentences(text: str, max_tokens: int) -> str:
+    """Recortar el texto en el último límite de oración que entre en max_tokens"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    cuts = [m.start() for m in SENTENCE_BOUNDARY.finditer(text)]
+    # Búsqueda binaria del último corte que entra (los prefijos crecen monótonamente)
+    low, high, best = 0, len(cuts) - 1, ""
+    while low <= high:
+        middle = (low + high) // 2
+        prefix = text[:cuts[middle]].rstrip()
+        if _count_uncached(prefix) <= max_tokens:
+            best = prefix
+            low = middle + 1
+        else:
+            high = middle - 1
+    # Cerrar un bloque de código que haya quedado abierto
+    if best.count("```") % 2 == 1:
+        best += "\n```"
+    return best
+
+
+def context_budget(question_type: str) -> int:
+    """Presupuesto de tokens de contexto para el tipo de pregunta"""
+    budget = CONTEXT_TOKEN_BUDGETS.get(question_type, CHATBOT_CONFIG["max_context_length"])
+    return min(budget, CHATBOT_CONFIG["max_context_length"])
+
+
+def pack_context(pieces: List[str], question_type: str = "general_help",
+                 budget: int = None) -> Dict[str, Any]:
+    """Llenar el presupuesto de tokens de forma greedy con piezas ordenadas por relevancia.
+
+    La primera pieza que no entra completa se recorta en límite de oración
+    y el empaquetado termina ahí.
+    """
+    budget = context_budget(question_type) if budget is None else budget
+    min_piece = CONTEXT_TOKEN_BUDGETS["min_piece_tokens"]
+    separator_tokens = count_tokens("\n\n")
+
+    packed = []
+    used = 0
+    for piece in pieces:
+        piece = piece.strip()
+        if not piece:
+            continue
+        cost = count_tokens(piece) + (separator_tokens if packed else 0)
+        if used + cost <= budget:
+            packed.append(piece)
+            used += cost
+            continue
+        remaining = budget - used - (separator_tokens if packed else 0)
+        if remaining >= min_piece:
+            trimmed = trim_to_sentences(piece, remaining)
+            if trimmed:
+                packed.append(trimmed)
+                used += count_tokens(trimmed) + (separator_tokens if len(packed) > 1 else 0)
+        break
+
+    return {
+        'context': "\n\n".join(packed),
+        'tokens': used,
+        'budget': budget,
+        'pieces': len(packed)
+    }
@@ -0,0 +1,38 @@
+import time
+from typing import Optional
+
+from config import DEADLINE_CONFIG
+
+
+class Deadline:
+    """Presupuesto de tiempo de un request que se reparte entre las etapas del pipeline"""
+
+    def __init__(self, budget_s: float = None):
+        budget_s = DEADLINE_CONFIG["default_budget_s"] if budget_s is None else budget_s
+        self.budget_s = max(0.0, min(budget_s, DEADLINE_CONFIG["max_budget_s"]))
+        self.start = time.monotonic()
+        self.expires_at = self.start + self.budget_s
+
+    @classmethod
+    def from_header(cls, value: Optional[str]) -> "Deadline":
+        """Crear el deadline desde el header (milisegundos) o el valor por defecto de config"""
+        try:
+            return cls(float(value) / 1000.0) if value else cls()
+        except ValueError:
+            return cls()
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.start
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def has_time_for(self, seconds: float) -> bool:
+        return self.remaining() >= seconds
+
+    def timeout(self, cap: float, reserve: float = 0.0) -> float:
+        """Timeout para una etapa: lo que queda (menos una reserva), sin superar cap"""
+        return max(DEADLINE_CONFIG["min_stage_timeout_s"], min(cap, self.remaining() - reserve))
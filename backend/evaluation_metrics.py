@@ -4,6 +4,9 @@ from sentence_transformers import CrossEncoder
 from sklearn.metrics.pairwise import cosine_similarity
 import time
 import json
+import sys
+from adaptive_retrieval import compute_thresholds, save_thresholds
+from config import RETRIEVAL_CONFIG
 
 class RAGEvaluator:
     def __init__(self):
@@ -136,26 +139,31 @@ class RAGEvaluator:
             {
                 'query': '¿Cómo declarar una variable en C#?',
                 'relevant_docs': ['variable declaration', 'data types', 'syntax'],
+                'content_keywords': ['declarar', 'variable', 'tipos de datos'],
                 'expected_response_type': 'syntax_help'
             },
             {
                 'query': 'Explica qué es un array en C#',
                 'relevant_docs': ['arrays', 'collections', 'data structures'],
+                'content_keywords': ['array', 'arreglo', '[]'],
                 'expected_response_type': 'concept_explanation'
             },
             {
                 'query': 'Dame un ejemplo de un bucle for en C#',
                 'relevant_docs': ['for loop', 'iteration', 'control structures'],
+                'content_keywords': ['bucle for', 'for (', 'for('],
                 'expected_response_type': 'code_example'
             },
             {
                 'query': '¿Cómo usar Console.WriteLine?',
                 'relevant_docs': ['console output', 'console.writeline', 'io operations'],
+                'content_keywords': ['console.writeline'],
                 'expected_response_type': 'code_example'
             },
             {
                 'query': 'Explica qué es ADO.NET',
                 'relevant_docs': ['ado.net', 'database access', 'data providers'],
+                'content_keywords': ['ado.net', 'sqlconnection', 'sqlcommand'],
                 'expected_response_type': 'concept_explanation'
             }
         ]
@@ -210,6 +218,33 @@ class RAGEvaluator:
         
         return report
 
+def calibrate_retrieval_thresholds(rag_system):
+    """Calibrar los umbrales de recuperación adaptativa con el dataset de evaluación"""
+    evaluator = RAGEvaluator()
+    test_queries = evaluator.create_test_dataset()
+    
+    print("📐 Calibrando umbrales de recuperación...")
+    
+    labeled_results = []
+    for query_data in test_queries:
+        chunks = rag_system.retrieve_relevant_chunks(
+            query_data['query'], n_results=RETRIEVAL_CONFIG["max_n_results"]
+        )
+        chunks.sort(key=lambda x: x.get('distance', 1.0))
+        # Términos que aparecen en los chunks (en español o en código), no las etiquetas en inglés
+        keywords = [keyword.lower() for keyword in query_data['content_keywords']]
+        labeled_results.append({
+            'distances': [chunk.get('distance', 1.0) for chunk in chunks],
+            'relevant': [any(keyword in chunk['content'].lower() for keyword in keywords)
+                         for chunk in chunks]
+        })
+    
+    thresholds = compute_thresholds(labeled_results)
+    save_thresholds(thresholds)
+    print(f"✅ Umbrales guardados: {thresholds}")
+    
+    return thresholds
+
 def run_evaluation(rag_system):
     """Ejecutar evaluación completa del sistema RAG"""
     evaluator = RAGEvaluator()
@@ -252,4 +287,7 @@ if __name__ == "__main__":
     from rag_chatbot import RAGChatbot
     
     chatbot = RAGChatbot()
-    results = run_evaluation(chatbot) 
\ No newline at end of file
+    if '--calibrate' in sys.argv:
+        calibrate_retrieval_thresholds(chatbot)
+    else:
+        results = run_evaluation(chatbot) 
\ No newline at end of file
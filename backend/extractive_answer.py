@@ -0,0 +1,104 @@
+import re
+import time
+from typing import List, Dict, Any, Tuple
+
+import numpy as np
+
+from config import EXTRACTIVE_CONFIG
+
+CODE_FENCE = re.compile(r'```[\w#+-]*\n?(.*?)(?:```|$)', re.DOTALL)
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+(?=[A-ZÁÉÍÓÚÑ¿¡])')
+DEFINITION_HINT = re.compile(r'\b(es|son|significa|permite|se usa|se utiliza|is|are)\b', re.IGNORECASE)
+
+
+def split_units(chunks: List[Dict[str, Any]]) -> Tuple[List[str], List[str]]:
+    """Separar los chunks en oraciones de texto y bloques de código"""
+    min_chars = EXTRACTIVE_CONFIG["min_unit_chars"]
+    sentences, code_blocks = [], []
+    seen = set()
+
+    for chunk in chunks:
+        content = chunk.get('content', '')
+        # Bloques de código (un fence sin cerrar llega hasta el final del chunk)
+        for match in CODE_FENCE.finditer(content):
+            code = match.group(1).strip()
+            if len(code) >= min_chars and code not in seen:
+                seen.add(code)
+                code_blocks.append(code)
+        text = CODE_FENCE.sub('\n', content)
+
+        for line in text.splitlines():
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            line = line.lstrip('-*• ').replace('**', '')
+            for sentence in SENTENCE_SPLIT.split(line):
+                sentence = sentence.strip()
+                if len(sentence) >= min_chars and sentence not in seen:
+                    seen.add(sentence)
+                    sentences.append(sentence)
+
+    return sentences, code_blocks
+
+
+class ExtractiveAnswerer:
+    """Respuestas sin LLM armadas con las oraciones y el código más relevantes del contexto"""
+
+    def __init__(self, embedding_model):
+        self.embedding_model = embedding_model
+
+    def answer(self, question: str, chunks: List[Dict[str, Any]], query_embedding=None) -> str:
+        """Armar una respuesta estructurada (definición, puntos clave y ejemplo de código)"""
+        start = time.time()
+        sentences, code_blocks = split_units(chunks)
+        if not sentences and not code_blocks:
+            return ""
+
+        if query_embedding is None:
+            query_embedding = self.embedding_model.encode(question)
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+
+        # Una sola pasada: oraciones y cabeceras de código en el mismo lote
+        code_heads = [code[:EXTRACTIVE_CONFIG["code_embed_chars"]] for code in code_blocks]
+        units = np.asarray(self.embedding_model.encode(sentences + code_heads), dtype=np.float32)
+        units /= np.linalg.norm(units, axis=1, keepdims=True)
+        scores = units @ query
+        sentence_vectors, sentence_scores = units[:len(sentences)], scores[:len(sentences)]
+        code_scores = scores[len(sentences):]
+
+        parts = ["**Respuesta basada en la documentación local**"]
+
+        chosen = []
+        order = np.argsort(sentence_scores)[::-1]
+        candidates = [i for i in order if sentence_scores[i] >= EXTRACTIVE_CONFIG["min_score"]]
+        if candidates:
+            # Definición: la oración mejor puntuada con forma de definición entre las primeras
+            definition = next((i for i in candidates[:5] if DEFINITION_HINT.search(sentences[i])), candidates[0])
+            chosen.append(definition)
+            parts.append(sentences[definition])
+
+            key_points = []
+            for i in candidates:
+                if len(key_points) >= EXTRACTIVE_CONFIG["max_key_points"]:
+                    break
+                if i == definition:
+                    continue
+                # Evitar puntos casi idénticos a los ya elegidos
+                if np.max(sentence_vectors[chosen] @ sentence_vectors[i]) > EXTRACTIVE_CONFIG["max_redundancy"]:
+                    continue
+                chosen.append(i)
+                key_points.append(sentences[i])
+            if key_points:
+                parts.append("**Puntos clave:**\n" + "\n".join(f"- {point}" for point in key_points))
+
+        if code_blocks:
+            best_code = int(np.argmax(code_scores))
+            if code_scores[best_code] >= EXTRACTIVE_CONFIG["min_code_score"]:
+                parts.append(f"**Ejemplo:**\n```csharp\n{code_blocks[best_code]}\n```")
+
+        if len(parts) == 1:
+            return ""
+
+        print(f"Respuesta extractiva generada en {(time.time() - start) * 1000:.0f} ms")
+        return "\n\n".join(parts)
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Servidor falso de Ollama para pruebas y benchmarks deterministas
+Implementa /api/generate (con y sin streaming), /api/chat, /api/tags y /api/ps
+con tiempo hasta el primer token, tokens/s, concurrencia, tasa de errores
+y respuestas predefinidas configurables
+"""
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List
+
+from config import FAKE_OLLAMA_CONFIG
+
+NS = 1e9
+
+
+def tokenize(text: str) -> List[str]:
+    """Partir el texto en 'tokens' (palabras con su espacio) como los entrega Ollama"""
+    tokens, current = [], ""
+    for char in text:
+        current += char
+        if char in " \n":
+            tokens.append(current)
+            current = ""
+    if current:
+        tokens.append(current)
+    return tokens
+
+
+class FakeOllama:
+    """Estado y comportamiento del servidor falso (independiente de HTTP)"""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        self.config = {**FAKE_OLLAMA_CONFIG, **(config or {})}
+        self._slots = threading.Semaphore(self.config["concurrency"])
+        self._lock = threading.Lock()
+        self._random = random.Random(self.config["seed"])
+        self._loaded = set()
+        self.stats = {'requests': 0, 'errors': 0, 'in_flight': 0, 'max_in_flight': 0,
+                      'queued': 0, 'max_queued': 0, 'by_path': {}}
+
+    def answer_for(self, prompt: str) -> str:
+        """Respuesta predefinida: la primera clave contenida en el prompt, o la respuesta por defecto"""
+        for key, answer in self.config["canned"].items():
+            if key.lower() in prompt.lower():
+                return answer
+        return self.config["default_response"]
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            return self._random.random() < self.config["error_rate"]
+
+    def acquire(self):
+        """Esperar un slot libre: como Ollama, los requests extra se encolan"""
+        with self._lock:
+            self.stats['queued'] += 1
+            self.stats['max_queued'] = max(self.stats['max_queued'], self.stats['queued'])
+        self._slots.acquire()
+        with self._lock:
+            self.stats['queued'] -= 1
+            self.stats['in_flight'] += 1
+            self.stats['max_in_flight'] = max(self.stats['max_in_flight'], self.stats['in_flight'])
+
+    def release(self):
+        with self._lock:
+            self.stats['in_flight'] -= 1
+        self._slots.release()
+
+    def load(self, model: str) -> float:
+        """Simular la carga del modelo la primera vez que se usa"""
+        with self._lock:
+            if model in self._loaded:
+                return 0.0
+            self._loaded.add(model)
+        time.sleep(self.config["load_s"])
+        return self.config["load_s"]
+
+    def generate(self, model: str, prompt: str, num_predict: int = None):
+        """Generar tokens respetando el TTFT y los tokens/s; el último elemento son las métricas"""
+        start = time.time()
+        load_s = self.load(model)
+        prompt_tokens = len(tokenize(prompt))
+        tokens = tokenize(self.answer_for(prompt))
+        if num_predict and num_predict > 0:
+            tokens = tokens[:num_predict]
+
+        time.sleep(self.config["ttft_s"])
+        prompt_s = time.time() - start - load_s
+        interval = 1.0 / self.config["tokens_per_s"] if self.config["tokens_per_s"] else 0
+        eval_start = time.time()
+        for token in tokens:
+            yield token
+            time.sleep(interval)
+
+        yield {
+            'done': True,
+            'done_reason': 'length' if num_predict and len(tokens) >= num_predict else 'stop',
+            'total_duration': int((time.time() - start) * NS),
+            'load_duration': int(load_s * NS),
+            'prompt_eval_count': prompt_tokens,
+            'prompt_eval_duration': int(prompt_s * NS),
+            'eval_count': len(tokens),
+            'eval_duration': int((time.time() - eval_start) * NS),
+            'context': list(range(prompt_tokens + len(tokens)))
+        }
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def fake(self) -> FakeOllama:
+        return self.server.fake
+
+    def log_message(self, format, *args):
+        if self.fake.config["verbose"]:
+            super().log_message(format, *args)
+
+    def send_json(self, status: int, body: Dict[str, Any]):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_chunk(self, body: Dict[str, Any]):
+        data = (json.dumps(body) + "\n").encode('utf-8')
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def count(self):
+        with self.fake._lock:
+            self.fake.stats['requests'] += 1
+            self.fake.stats['by_path'][self.path] = self.fake.stats['by_path'].get(self.path, 0) + 1
+
+    def do_GET(self):
+        self.count()
+        models = [{'name': f"{name}:latest", 'model': f"{name}:latest", 'size': 0}
+                  for name in self.fake.config["models"]]
+        if self.path == '/api/tags':
+            self.send_json(200, {'models': models})
+        elif self.path == '/api/ps':
+            self.send_json(200, {'models': [model for model in models
+                                            if model['name'].split(':')[0] in self.fake._loaded]})
+        elif self.path == '/':
+            self.send_json(200, {'status': 'Ollama is running'})
+        else:
+            self.send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        self.count()
+        if self.path not in ('/api/generate', '/api/chat'):
+            self.send_json(404, {'error': 'not found'})
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        model = payload.get('model', '').split(':')[0]
+        if model not in self.fake.config["models"]:
+            self.send_json(404, {'error': f"model '{model}' not found"})
+            return
+
+        if self.fake.should_fail():
+            with self.fake._lock:
+                self.fake.stats['errors'] += 1
+            self.send_json(500, {'error': 'fake error'})
+            return
+
+        chat = self.path == '/api/chat'
+        if chat:
+            prompt = "\n".join(message.get('content', '') for message in payload.get('messages', []))
+        else:
+            prompt = payload.get('prompt', '')
+        num_predict = payload.get('options', {}).get('num_predict')
+
+        self.fake.acquire()
+        try:
+            if payload.get('stream', True):
+                self.stream(model, prompt, num_predict, chat)
+            else:
+                text = ""
+                for item in self.fake.generate(model, prompt, num_predict):
+                    if isinstance(item, dict):
+                        final = item
+                    else:
+                        text += item
+                self.send_json(200, self.message(model, text, chat, final))
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # El cliente cortó el stream
+        finally:
+            self.fake.release()
+
+    def message(self, model: str, text: str, chat: bool, final: Dict[str, Any] = None) -> Dict[str, Any]:
+        body = {'model': model, 'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ'), 'done': False}
+        if chat:
+            body['message'] = {'role': 'assistant', 'content': text}
+        else:
+            body['response'] = text
+        if final:
+            if chat:
+                final = {key: value for key, value in final.items() if key != 'context'}
+            body.update(final)
+        return body
+
+    def stream(self, model: str, prompt: str, num_predict: int, chat: bool):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for item in self.fake.generate(model, prompt, num_predict):
+            if isinstance(item, dict):
+                self.send_chunk(self.message(model, "", chat, item))
+            else:
+                self.send_chunk(self.message(model, item, chat))
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+class FakeOllamaServer:
+    """Servidor falso en un hilo de fondo.
+
+    with FakeOllamaServer({"tokens_per_s": 50}) as fake:
+        os.environ["OLLAMA_URL"] = fake.url
+    """
+
+    def __init__(self, config: Dict[str, Any] = None, host: str = None, port: int = None):
+        self.fake = FakeOllama(config)
+        host = host or self.fake.config["host"]
+        port = self.fake.config["port"] if port is None else port
+        self.httpd = ThreadingHTTPServer((host, port), FakeOllamaHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.fake = self.fake
+        self._thread = None
+        self._previous_env = None   # Variables de Ollama a restaurar si se usó use_fake
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return self.fake.stats
+
+    def start(self) -> 'FakeOllamaServer':
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True, name="fake-ollama")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._previous_env is not None:
+            # Volver a la configuración de Ollama anterior y descartar el cliente del servidor falso
+            from ollama_client import reset_ollama_client
+            for name, value in self._previous_env.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+            self._previous_env = None
+            reset_ollama_client()
+
+    def __enter__(self) -> 'FakeOllamaServer':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def use_fake(server: FakeOllamaServer):
+    """Apuntar el cliente compartido de Ollama al servidor falso (se restaura al detenerlo)"""
+    from ollama_client import reset_ollama_client
+    if server._previous_env is None:
+        server._previous_env = {name: os.environ.get(name) for name in ('OLLAMA_URL', 'OLLAMA_URLS')}
+    os.environ['OLLAMA_URL'] = server.url
+    os.environ.pop('OLLAMA_URLS', None)
+    reset_ollama_client()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor falso de Ollama para pruebas y benchmarks')
+    parser.add_argument('--port', type=int, default=FAKE_OLLAMA_CONFIG["port"])
+    parser.add_argument('--ttft', type=float, default=FAKE_OLLAMA_CONFIG["ttft_s"], help='Segundos hasta el primer token')
+    parser.add_argument('--tokens-per-s', type=float, default=FAKE_OLLAMA_CONFIG["tokens_per_s"])
+    parser.add_argument('--concurrency', type=int, default=FAKE_OLLAMA_CONFIG["concurrency"])
+    parser.add_argument('--error-rate', type=float, default=FAKE_OLLAMA_CONFIG["error_rate"])
+    parser.add_argument('--load', type=float, default=FAKE_OLLAMA_CONFIG["load_s"], help='Segundos de carga del modelo')
+    parser.add_argument('--canned', help='JSON con {fragmento del prompt: respuesta}')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    config = {
+        'ttft_s': args.ttft,
+        'tokens_per_s': args.tokens_per_s,
+        'concurrency': args.concurrency,
+        'error_rate': args.error_rate,
+        'load_s': args.load,
+        'verbose': args.verbose
+    }
+    if args.canned:
+        with open(args.canned, 'r', encoding='utf-8') as f:
+            config['canned'] = json.load(f)
+
+    server = FakeOllamaServer(config, port=args.port)
+    print(f"🤖 Ollama falso escuchando en {server.url}")
+    print(f"   TTFT {args.ttft}s, {args.tokens_per_s} tokens/s, concurrencia {args.concurrency}, "
+          f"errores {args.error_rate:.0%}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Servidor detenido")
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import os
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from config import FAQ_CONFIG
+
+
+def parse_faq_file(path: str) -> Optional[Dict[str, Any]]:
+    """Leer una respuesta curada: encabezado con preguntas entre '---' y la respuesta en markdown"""
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+
+    if not text.startswith('---'):
+        return None
+    _, header, answer = text.split('---', 2)
+
+    questions = [line.strip()[1:].strip() for line in header.splitlines()
+                 if line.strip().startswith('-')]
+    if not questions or not answer.strip():
+        return None
+
+    return {
+        'id': os.path.splitext(os.path.basename(path))[0],
+        'questions': questions,
+        'answer': answer.strip()
+    }
+
+
+class FAQIndex:
+    """Índice de respuestas curadas servidas antes de la recuperación y el LLM"""
+
+    def __init__(self, embedding_model, directory: str = None, threshold: float = None):
+        directory = directory or FAQ_CONFIG["directory"]
+        if not os.path.isabs(directory):
+            directory = os.path.join(os.path.dirname(__file__), directory)
+        self.directory = directory
+        self.threshold = FAQ_CONFIG["threshold"] if threshold is None else threshold
+
+        self.entries = self._load_entries()
+        self.answers = {entry['id']: entry['answer'] for entry in self.entries}
+
+        # Una fila por pregunta de ejemplo, mapeada a su respuesta
+        self.question_owner = [entry['id'] for entry in self.entries for _ in entry['questions']]
+        questions = [q for entry in self.entries for q in entry['questions']]
+        if questions:
+            matrix = np.asarray(embedding_model.encode(questions), dtype=np.float32)
+            self.matrix = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+        else:
+            self.matrix = None
+
+    def _load_entries(self) -> List[Dict[str, Any]]:
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for filename in sorted(os.listdir(self.directory)):
+            if filename.endswith('.md'):
+                try:
+                    entry = parse_faq_file(os.path.join(self.directory, filename))
+                    if entry:
+                        entries.append(entry)
+                except Exception as e:
+                    print(f"Error cargando FAQ {filename}: {e}")
+        return entries
+
+    def match(self, query_embedding, threshold: float = None) -> Optional[Dict[str, Any]]:
+        """Devolver la respuesta curada si la pregunta supera el umbral de similitud"""
+        threshold = self.threshold if threshold is None else threshold
+        if self.matrix is None or not FAQ_CONFIG["enabled"]:
+            return None
+        query = np.asarray(query_embedding, dtype=np.float32)
+        similarities = self.matrix @ (query / (np.linalg.norm(query) or 1.0))
+        best = int(np.argmax(similarities))
+        if similarities[best] < threshold:
+            return None
+        faq_id = self.question_owner[best]
+        return {'id': faq_id, 'answer': self.answers[faq_id], 'similarity': float(similarities[best])}
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Perfiles de generación por tipo de pregunta y registro de longitudes reales
+Ejecutar este módulo sugiere num_predict por tipo a partir del log
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, List
+
+from config import GENERATION_PROFILES, GENERATION_FEEDBACK_CONFIG, OLLAMA_CONFIG
+from jsonl_log import append_jsonl, log_files, resolve_log_path
+
+
+def _percentile(values: List[int], fraction: float) -> int:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def suggest_num_predict(lengths: List[int]) -> int:
+    """num_predict sugerido: percentil configurado de las longitudes reales más un margen"""
+    config = GENERATION_FEEDBACK_CONFIG
+    value = _percentile(lengths, config["percentile"]) * (1 + config["margin"])
+    return int(max(config["min_num_predict"], min(config["max_num_predict"], value)))
+
+
+def log_path() -> str:
+    return resolve_log_path(GENERATION_FEEDBACK_CONFIG["log_file"])
+
+
+def base_options() -> Dict[str, Any]:
+    """Opciones de generación por defecto de OLLAMA_CONFIG"""
+    return {
+        "temperature": OLLAMA_CONFIG["temperature"],
+        "num_predict": OLLAMA_CONFIG["num_predict"],
+        "top_p": OLLAMA_CONFIG["top_p"],
+        "top_k": OLLAMA_CONFIG["top_k"]
+    }
+
+
+class GenerationProfiles:
+    """Opciones de generación por tipo de pregunta, ajustadas con las longitudes observadas"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lengths = {}  # tipo -> deque de eval_count recientes
+        self._truncated = {}
+
+    def options_for(self, question_type: str) -> Dict[str, Any]:
+        """Solo las opciones que fija el perfil del tipo de pregunta (num_predict ajustado si auto_tune)"""
+        options = dict(GENERATION_PROFILES.get(question_type, GENERATION_PROFILES["general_help"]))
+
+        if GENERATION_FEEDBACK_CONFIG["auto_tune"]:
+            with self._lock:
+                lengths = list(self._lengths.get(question_type, []))
+            if len(lengths) >= GENERATION_FEEDBACK_CONFIG["min_samples"]:
+                options["num_predict"] = suggest_num_predict(lengths)
+        return options
+
+    def record(self, question_type: str, model: str, num_predict: int, data: Dict[str, Any]):
+        """Registrar la longitud real de una respuesta de Ollama"""
+        eval_count = data.get("eval_count")
+        if not eval_count:
+            return
+        truncated = data.get("done_reason") == "length" or eval_count >= num_predict
+        with self._lock:
+            window = self._lengths.setdefault(question_type, deque(maxlen=GENERATION_FEEDBACK_CONFIG["window"]))
+            window.append(eval_count)
+            self._truncated[question_type] = self._truncated.get(question_type, 0) + int(truncated)
+
+        entry = {
+            'timestamp': time.time(),
+            'question_type': question_type,
+            'model': model,
+            'num_predict': num_predict,
+            'eval_count': eval_count,
+            'truncated': truncated
+        }
+        try:
+            with self._lock:
+                append_jsonl(log_path(), entry, GENERATION_FEEDBACK_CONFIG["max_log_bytes"])
+        except Exception as e:
+            print(f"Error registrando longitud de generación: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                question_type: {
+                    'samples': len(lengths),
+                    'avg_tokens': round(sum(lengths) / len(lengths), 1),
+                    'truncated': self._truncated.get(question_type, 0),
+                    'suggested_num_predict': suggest_num_predict(list(lengths))
+                }
+                for question_type, lengths in self._lengths.items() if lengths
+            }
+
+
+def close_code_fence(text: str) -> str:
+    """Cerrar un bloque de código que quedó abierto por una secuencia de stop o num_predict"""
+    if text.count("```") % 2 == 1:
+        return text.rstrip() + "\n```"
+    return text
+
+
+def main():
+    """Sugerir num_predict por tipo de pregunta a partir del log de longitudes"""
+    path = log_path()
+    if not log_files(path):
+        print(f"❌ No existe el log {path}")
+        return
+
+    lengths, truncated = {}, {}
+    for log_file in log_files(path):
+        with open(log_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                entry = json.loads(line)
+                lengths.setdefault(entry['question_type'], []).append(entry['eval_count'])
+                truncated[entry['question_type']] = truncated.get(entry['question_type'], 0) + int(entry['truncated'])
+
+    print("📏 Longitud de respuestas por tipo de pregunta")
+    for question_type, values in sorted(lengths.items()):
+        current = GENERATION_PROFILES.get(question_type, {}).get("num_predict")
+        print(f"- {question_type}: {len(values)} respuestas, promedio {sum(values) / len(values):.0f} tokens, "
+              f"{truncated[question_type]} truncadas, num_predict actual {current}, "
+              f"sugerido {suggest_num_predict(values)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import re
+from typing import Iterable
+
+from bs4 import BeautifulSoup
+from bs4.element import CData, NavigableString
+
+from config import WEB_SEARCH_CONFIG
+from deadline import Deadline
+
+try:
+    import lxml  # noqa: F401
+    _FAST_PARSER = "lxml"
+except ImportError:
+    _FAST_PARSER = None
+
+SKIPPED_TAGS = {'script', 'style', 'nav', 'header', 'footer', 'noscript', 'svg', 'button', 'form'}
+
+# Región principal de las páginas de docs.microsoft.com / learn.microsoft.com
+MAIN_START = re.compile(rb'<main\b', re.IGNORECASE)
+MAIN_END = re.compile(rb'</main\s*>', re.IGNORECASE)
+ARTICLE_START = re.compile(rb'<article\b', re.IGNORECASE)
+ARTICLE_END = re.compile(rb'</article\s*>', re.IGNORECASE)
+
+
+def parser_name() -> str:
+    """Parser de BeautifulSoup: lxml si está instalado (y configurado), si no html.parser"""
+    preferred = WEB_SEARCH_CONFIG["html_parser"]
+    if preferred == "auto":
+        return _FAST_PARSER or "html.parser"
+    if preferred == "lxml" and _FAST_PARSER is None:
+        return "html.parser"
+    return preferred
+
+
+def read_limited(chunks: Iterable[bytes], max_bytes: int, deadline: Deadline = None) -> bytes:
+    """Leer el cuerpo por partes hasta max_bytes, hasta que cierre la región principal o venza el deadline"""
+    # bytearray: agregar un chunk no copia todo lo leído hasta ahora
+    data = bytearray()
+    for chunk in chunks:
+        data += chunk
+        if len(data) >= max_bytes:
+            return bytes(data[:max_bytes])
+        # Un host que envía de a poco no retiene el hilo de descarga después del plazo
+        if deadline is not None and deadline.expired():
+            break
+        # El artículo ya terminó: el resto de la página (pie, scripts) no hace falta
+        if MAIN_END.search(data, max(0, len(data) - len(chunk) - 16)):
+            break
+    return bytes(data)
+
+
+def main_region(html: bytes) -> bytes:
+    """Recortar el HTML al <main> (o <article>) si existe; si no, la página completa"""
+    for start_pattern, end_pattern in ((MAIN_START, MAIN_END), (ARTICLE_START, ARTICLE_END)):
+        start = start_pattern.search(html)
+        if start:
+            end = end_pattern.search(html, start.end())
+            return html[start.start():end.end() if end else len(html)]
+    return html
+
+
+def extract_text(html: bytes, max_chars: int, encoding: str = None) -> str:
+    """Texto de la región principal, cortando apenas se juntan max_chars caracteres"""
+    region = main_region(html).decode(encoding or 'utf-8', errors='replace')
+    soup = BeautifulSoup(region, parser_name())
+
+    pieces, total = [], 0
+    # descendants se recorre a medida que se avanza (find_all armaría antes la lista completa)
+    for string in soup.descendants:
+        # Comment, Doctype, Declaration, etc. también son NavigableString: solo texto visible
+        if type(string) not in (NavigableString, CData):
+            continue
+        if any(parent.name in SKIPPED_TAGS for parent in string.parents):
+            continue
+        text = " ".join(string.split())
+        if not text:
+            continue
+        pieces.append(text)
+        total += len(text) + 1
+        if total >= max_chars:
+            break
+    return " ".join(pieces)[:max_chars]
@@ -0,0 +1,100 @@
+import re
+from typing import List, Dict
+
+import numpy as np
+
+from config import INTENT_CONFIG
+
+# Reglas de palabras clave (en orden de prioridad), usadas como desempate
+KEYWORD_RULES = [
+    ('loop_specific', [
+        'for', 'while', 'do while', 'foreach', 'bucle', 'ciclo', 'loop',
+        'iterar', 'iteración', 'repetir', 'recorrer', 'contador'
+    ]),
+    ('database_specific', [
+        'base de datos', 'database', 'sql', 'conectar', 'conexión', 'entity framework',
+        'ado.net', 'linq', 'query', 'consulta', 'tabla', 'registro', 'insertar',
+        'actualizar', 'eliminar', 'select', 'insert', 'update', 'delete'
+    ]),
+    ('pattern_specific', [
+        'patrón', 'pattern', 'singleton', 'factory', 'observer', 'strategy',
+        'command', 'adapter', 'decorator', 'facade', 'proxy', 'template method',
+        'builder', 'prototype', 'chain of responsibility', 'mediator', 'memento'
+    ]),
+    ('code_example', [
+        'ejemplo', 'código', 'implementar', 'cómo hacer', 'muestra', 'muéstrame',
+        'dame', 'déjame', 'quiero ver', 'necesito', 'ayúdame con', 'cómo crear',
+        'programa', 'aplicación', 'proyecto', 'sample', 'demo', 'tutorial',
+        'ver', 'mostrar', 'enseñar', 'enseñame', 'ejemplifica', 'ilustra',
+        'código de', 'ejemplo de', 'muestra de', 'cómo se hace', 'cómo se crea',
+        'cómo implementar', 'cómo usar', 'cómo trabajar con'
+    ]),
+]
+
+DEFAULT_INTENT = 'general_help'
+
+
+def _word_pattern(keywords: List[str]):
+    # Coincidencia por palabra completa: 'for' no debe coincidir con "formulario"
+    alternatives = '|'.join(re.escape(keyword) for keyword in keywords)
+    return re.compile(r'(?<!\w)(?:' + alternatives + r')(?!\w)')
+
+
+KEYWORD_PATTERNS = [(intent, _word_pattern(keywords)) for intent, keywords in KEYWORD_RULES]
+
+
+def classify_by_keywords(question: str) -> str:
+    """Clasificar con las reglas de palabras clave"""
+    question_lower = question.lower()
+    for intent, pattern in KEYWORD_PATTERNS:
+        if pattern.search(question_lower):
+            return intent
+    return DEFAULT_INTENT
+
+
+class IntentClassifier:
+    """Clasificador por similitud del embedding de la pregunta con centroides por intención"""
+
+    def __init__(self, embedding_model, config: Dict = None):
+        self.config = {**INTENT_CONFIG, **(config or {})}
+        self.intents = list(self.config["examples"].keys())
+        self.centroids = self._build_centroids(embedding_model)
+
+    def _build_centroids(self, embedding_model) -> np.ndarray:
+        """Codificar todos los ejemplos en un solo lote y promediar por intención"""
+        texts, labels = [], []
+        for index, intent in enumerate(self.intents):
+            for example in self.config["examples"][intent]:
+                texts.append(example)
+                labels.append(index)
+        embeddings = np.asarray(embedding_model.encode(texts), dtype=np.float32)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+        labels = np.asarray(labels)
+
+        centroids = np.stack([embeddings[labels == i].mean(axis=0) for i in range(len(self.intents))])
+        return centroids / np.linalg.norm(centroids, axis=1, keepdims=True)
+
+    def _similarities(self, query_embedding) -> np.ndarray:
+        query = np.asarray(query_embedding, dtype=np.float32)
+        return self.centroids @ (query / (np.linalg.norm(query) or 1.0))
+
+    def scores(self, query_embedding) -> Dict[str, float]:
+        """Similitud coseno de la pregunta con cada intención"""
+        similarities = self._similarities(query_embedding)
+        return {intent: float(score) for intent, score in zip(self.intents, similarities)}
+
+    def classify(self, question: str, query_embedding) -> str:
+        """Elegir la intención más cercana; las reglas de palabras clave desempatan"""
+        similarities = self._similarities(query_embedding)
+        ranked = np.argsort(similarities)[::-1]
+        best, second = ranked[0], ranked[1] if len(ranked) > 1 else ranked[0]
+
+        if similarities[best] < self.config["min_similarity"]:
+            return classify_by_keywords(question)
+
+        if similarities[best] - similarities[second] < self.config["tie_margin"]:
+            keyword_intent = classify_by_keywords(question)
+            if keyword_intent in (self.intents[best], self.intents[second]):
+                return keyword_intent
+
+        return self.intents[best]
@@ -0,0 +1,27 @@
+import json
+import os
+from typing import Any, Dict, List
+
+
+def resolve_log_path(path: str) -> str:
+    """Ruta del log: relativa a BACKEND_LOG_DIR si está definido (p. ej. en pruebas), si no al backend"""
+    if os.path.isabs(path):
+        return path
+    return os.path.join(os.environ.get('BACKEND_LOG_DIR') or os.path.dirname(__file__), path)
+
+
+def rotated_path(path: str) -> str:
+    return path + ".1"
+
+
+def append_jsonl(path: str, entry: Dict[str, Any], max_bytes: int = None):
+    """Agregar una línea JSON al log; al superar max_bytes el log pasa a <path>.1 (se guarda uno solo)"""
+    if max_bytes and os.path.exists(path) and os.path.getsize(path) >= max_bytes:
+        os.replace(path, rotated_path(path))
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def log_files(path: str) -> List[str]:
+    """Archivos existentes del log, del más viejo (rotado) al actual"""
+    return [candidate for candidate in (rotated_path(path), path) if os.path.exists(candidate)]
@@ -0,0 +1,110 @@
+import threading
+import time
+from typing import Dict, Any
+
+from config import LLM_TELEMETRY_CONFIG
+from jsonl_log import append_jsonl, resolve_log_path
+
+NS = 1e9
+
+
+def _empty() -> Dict[str, float]:
+    return {
+        'calls': 0,
+        'prompt_tokens': 0,
+        'eval_tokens': 0,
+        'prompt_s': 0.0,
+        'eval_s': 0.0,
+        'load_s': 0.0,
+        'total_s': 0.0,
+        'reloads': 0,
+        'max_prompt_tokens': 0
+    }
+
+
+def _summary(totals: Dict[str, float]) -> Dict[str, Any]:
+    calls = totals['calls'] or 1
+    return {
+        'calls': totals['calls'],
+        'reloads': totals['reloads'],
+        'prompt_tokens_per_s': round(totals['prompt_tokens'] / totals['prompt_s'], 1) if totals['prompt_s'] else None,
+        'eval_tokens_per_s': round(totals['eval_tokens'] / totals['eval_s'], 1) if totals['eval_s'] else None,
+        'avg_prompt_tokens': round(totals['prompt_tokens'] / calls, 1),
+        'max_prompt_tokens': totals['max_prompt_tokens'],
+        'avg_eval_tokens': round(totals['eval_tokens'] / calls, 1),
+        # Reparto del tiempo total entre carga del modelo, evaluación del prompt y generación
+        'prompt_time_share': round(totals['prompt_s'] / totals['total_s'], 3) if totals['total_s'] else None,
+        'eval_time_share': round(totals['eval_s'] / totals['total_s'], 3) if totals['total_s'] else None,
+        'load_time_share': round(totals['load_s'] / totals['total_s'], 3) if totals['total_s'] else None,
+        'avg_total_s': round(totals['total_s'] / calls, 3)
+    }
+
+
+class LLMTelemetry:
+    """Métricas de throughput de Ollama por llamada, agregadas por modelo y por tipo de pregunta"""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        self.config = {**LLM_TELEMETRY_CONFIG, **(config or {})}
+        self._lock = threading.Lock()
+        self._by_model = {}
+        self._by_type = {}
+
+    def record(self, question_type: str, model: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Registrar los contadores y duraciones (en ns) que Ollama devuelve al terminar"""
+        if not data or not data.get('total_duration'):
+            return {}
+
+        call = {
+            'prompt_tokens': data.get('prompt_eval_count', 0),
+            'eval_tokens': data.get('eval_count', 0),
+            'prompt_s': data.get('prompt_eval_duration', 0) / NS,
+            'eval_s': data.get('eval_duration', 0) / NS,
+            'load_s': data.get('load_duration', 0) / NS,
+            'total_s': data.get('total_duration', 0) / NS
+        }
+        # Un load_duration alto significa que Ollama tuvo que (re)cargar el modelo
+        reloaded = call['load_s'] * 1000 >= self.config["reload_threshold_ms"]
+
+        with self._lock:
+            for table, key in ((self._by_model, model), (self._by_type, question_type)):
+                totals = table.setdefault(key, _empty())
+                totals['calls'] += 1
+                for field in ('prompt_tokens', 'eval_tokens', 'prompt_s', 'eval_s', 'load_s', 'total_s'):
+                    totals[field] += call[field]
+                totals['reloads'] += int(reloaded)
+                totals['max_prompt_tokens'] = max(totals['max_prompt_tokens'], call['prompt_tokens'])
+
+        entry = {
+            'timestamp': time.time(),
+            'model': model,
+            'question_type': question_type,
+            **{field: round(value, 4) if isinstance(value, float) else value for field, value in call.items()},
+            'eval_tokens_per_s': round(call['eval_tokens'] / call['eval_s'], 1) if call['eval_s'] else None,
+            'reloaded': reloaded
+        }
+        self._log(entry)
+        return entry
+
+    def _log(self, entry: Dict[str, Any]):
+        if self.config["log_calls"]:
+            print(f"📊 {entry['model']} [{entry['question_type']}]: prompt {entry['prompt_tokens']} tok "
+                  f"en {entry['prompt_s']:.2f}s, generación {entry['eval_tokens']} tok "
+                  f"({entry['eval_tokens_per_s']} tok/s), carga {entry['load_s']:.2f}s"
+                  f"{' (recarga del modelo)' if entry['reloaded'] else ''}")
+
+        path = self.config["log_file"]
+        if not path:
+            return
+        path = resolve_log_path(path)
+        try:
+            with self._lock:
+                append_jsonl(path, entry, self.config["max_log_bytes"])
+        except Exception as e:
+            print(f"Error registrando telemetría de Ollama: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'by_model': {model: _summary(totals) for model, totals in self._by_model.items()},
+                'by_question_type': {question_type: _summary(totals) for question_type, totals in self._by_type.items()}
+            }
@@ -0,0 +1,107 @@
+import threading
+from typing import Dict, Any, List, Optional
+
+from config import MODEL_ROUTING_CONFIG, RECOMMENDED_MODELS, OLLAMA_CONFIG
+
+
+class ModelRouter:
+    """Elige el modelo de Ollama por request según tipo de pregunta, tamaño del prompt y latencia medida"""
+
+    def __init__(self, client, config: Dict[str, Any] = None):
+        self.client = client
+        self.config = {**MODEL_ROUTING_CONFIG, **(config or {})}
+        self.default_model = OLLAMA_CONFIG["model"]
+        self.fast_model = RECOMMENDED_MODELS[self.config["fast_role"]]
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _model_stats(self, model: str) -> Dict[str, Any]:
+        if model not in self._stats:
+            self._stats[model] = {
+                'in_flight': 0,
+                'requests': 0,
+                'failures': 0,
+                'downgraded_to': 0,
+                'prompt_ms_per_token': self.config["initial_prompt_ms_per_token"],
+                'eval_ms_per_token': self.config["initial_eval_ms_per_token"],
+                'latency_ms': None
+            }
+        return self._stats[model]
+
+    def installed_models(self) -> Optional[set]:
+        """Modelos disponibles en el pool de Ollama"""
+        return self.client.installed_models()
+
+    def _available(self, model: str) -> bool:
+        installed = self.installed_models()
+        return installed is None or model in installed
+
+    def estimate_ms(self, model: str, prompt_tokens: int, num_predict: int) -> float:
+        """Latencia estimada: evaluación del prompt + generación, más la cola de requests en curso"""
+        # La cola se reparte entre los endpoints del pool que tienen el modelo
+        hosts = max(1, sum(1 for endpoint in self.client.endpoints if endpoint.has_model(model) is not False))
+        with self._lock:
+            stats = self._model_stats(model)
+            service = stats['prompt_ms_per_token'] * prompt_tokens + stats['eval_ms_per_token'] * num_predict
+            return service * (1 + stats['in_flight'] / (self.config["parallel_per_model"] * hosts))
+
+    def choose(self, question_type: str, prompt_tokens: int, num_predict: int,
+               slo_ms: float = None, pinned: str = None) -> str:
+        """Modelo preferido para el tipo de pregunta, bajando al rápido si el SLO peligra"""
+        if pinned:
+            return pinned
+
+        role = self.config["by_question_type"].get(question_type)
+        model = RECOMMENDED_MODELS.get(role, self.default_model) if role else self.default_model
+        if not self._available(model):
+            model = self.default_model
+
+        slo_ms = self.config["slo_ms"] if slo_ms is None else min(slo_ms, self.config["slo_ms"])
+        if (model != self.fast_model and self._available(self.fast_model)
+                and self.estimate_ms(model, prompt_tokens, num_predict) > slo_ms):
+            print(f"Latencia estimada de {model} excede el SLO, usando {self.fast_model}")
+            with self._lock:
+                self._model_stats(self.fast_model)['downgraded_to'] += 1
+            model = self.fast_model
+        return model
+
+    def routable_models(self) -> List[str]:
+        """Modelos a los que puede ir un request: el por defecto, los de cada tipo y el rápido"""
+        models = [self.default_model]
+        for role in self.config["by_question_type"].values():
+            models.append(RECOMMENDED_MODELS.get(role, self.default_model))
+        models.append(self.fast_model)
+        return list(dict.fromkeys(models))
+
+    def options_for(self, model: str) -> Dict[str, Any]:
+        """Opciones de generación específicas del modelo"""
+        return dict(self.config["model_options"].get(model, {}))
+
+    def begin(self, model: str):
+        with self._lock:
+            self._model_stats(model)['in_flight'] += 1
+
+    def end(self, model: str, data: Dict[str, Any] = None, elapsed_s: float = None):
+        """Registrar el fin de un request con las métricas devueltas por Ollama"""
+        alpha = self.config["ema_alpha"]
+        with self._lock:
+            stats = self._model_stats(model)
+            stats['in_flight'] = max(0, stats['in_flight'] - 1)
+            stats['requests'] += 1
+            if not data:
+                stats['failures'] += 1
+                return
+            if data.get('prompt_eval_count'):
+                per_token = data.get('prompt_eval_duration', 0) / 1e6 / data['prompt_eval_count']
+                stats['prompt_ms_per_token'] += alpha * (per_token - stats['prompt_ms_per_token'])
+            if data.get('eval_count'):
+                per_token = data.get('eval_duration', 0) / 1e6 / data['eval_count']
+                stats['eval_ms_per_token'] += alpha * (per_token - stats['eval_ms_per_token'])
+            if elapsed_s is not None:
+                latency = elapsed_s * 1000
+                previous = stats['latency_ms']
+                stats['latency_ms'] = latency if previous is None else previous + alpha * (latency - previous)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {model: dict(stats) for model, stats in self._stats.items()}
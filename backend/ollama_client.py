@@ -0,0 +1,290 @@
+import os
+import threading
+import time
+from typing import List, Optional, Set
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import OLLAMA_CONFIG, OLLAMA_POOL_CONFIG
+
+
+def ollama_endpoints() -> List[str]:
+    """URLs de Ollama: OLLAMA_URLS (separadas por coma), OLLAMA_URL o la configuración"""
+    if os.environ.get('OLLAMA_URLS'):
+        urls = os.environ['OLLAMA_URLS'].split(',')
+    elif os.environ.get('OLLAMA_URL'):
+        urls = [os.environ['OLLAMA_URL']]
+    else:
+        urls = OLLAMA_CONFIG.get("endpoints") or [OLLAMA_CONFIG["url"]]
+    return [url.strip().rstrip('/') for url in urls if url.strip()]
+
+
+def primary_endpoint() -> str:
+    """Primer endpoint del pool configurado (el servidor local que inician los scripts de setup y prueba)"""
+    return ollama_endpoints()[0]
+
+
+class Endpoint:
+    """Un servidor de Ollama del pool con su estado de salud y los modelos que tiene"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.unhealthy_until = 0.0
+        self.installed = None   # set de modelos instalados (/api/tags), None = desconocido
+        self.loaded = set()     # Modelos cargados en memoria (/api/ps o usados recientemente)
+        self.models_checked_at = 0.0
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.unhealthy_until
+
+    def has_model(self, model: str) -> Optional[bool]:
+        if self.installed is None:
+            return None
+        return model in self.installed
+
+    def stats(self) -> dict:
+        return {
+            'url': self.url,
+            'healthy': self.healthy(time.time()),
+            'outstanding': self.outstanding,
+            'requests': self.requests,
+            'failures': self.failures,
+            'loaded': sorted(self.loaded),
+            'installed': sorted(self.installed) if self.installed is not None else None
+        }
+
+
+def _model_names(models: list) -> Set[str]:
+    names = {model['name'] for model in models}
+    # "llama2" está instalado como "llama2:latest"
+    return names | {name.split(':')[0] for name in names if name.endswith(':latest')}
+
+
+class OllamaClient:
+    """Sesión HTTP compartida (keep-alive) hacia un pool de servidores de Ollama.
+
+    Cada request va al endpoint sano con menos requests en curso, prefiriendo los que
+    ya tienen cargado el modelo pedido; si la conexión falla se reintenta en otro.
+    """
+
+    def __init__(self, endpoints: List[str] = None, pool_size: int = None):
+        self.endpoints = [Endpoint(url) for url in (endpoints or ollama_endpoints())]
+        if not self.endpoints:
+            raise ValueError("No hay endpoints de Ollama configurados (OLLAMA_URLS, OLLAMA_URL o OLLAMA_CONFIG)")
+        self.base_url = self.endpoints[0].url
+        self.config = OLLAMA_POOL_CONFIG
+        self._lock = threading.Lock()
+        pool_size = pool_size or OLLAMA_CONFIG["pool_size"]
+
+        # Reintentos solo de conexión: un timeout de lectura no se repite
+        retry = Retry(total=OLLAMA_CONFIG["connect_retries"], connect=OLLAMA_CONFIG["connect_retries"],
+                      read=0, status=0, backoff_factor=0.1, allowed_methods=None)
+        adapter = HTTPAdapter(pool_connections=len(self.endpoints), pool_maxsize=pool_size,
+                              max_retries=retry, pool_block=False)
+
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._refresher = None
+        self._stop_refresh = threading.Event()
+
+    def url(self, path: str, endpoint: Endpoint = None) -> str:
+        base = endpoint.url if endpoint else self.base_url
+        return f"{base}/{path.lstrip('/')}"
+
+    def _pick(self, model: str = None, exclude: List[Endpoint] = ()) -> Optional[Endpoint]:
+        """Endpoint con menos requests en curso, priorizando salud y afinidad de modelo"""
+        now = time.time()
+        candidates = [endpoint for endpoint in self.endpoints if endpoint not in exclude]
+        if not candidates:
+            return None
+        healthy = [endpoint for endpoint in candidates if endpoint.healthy(now)]
+        candidates = healthy or candidates
+
+        if model:
+            # Solo hosts que tienen el modelo (o de los que aún no sabemos qué tienen)
+            with_model = [endpoint for endpoint in candidates if endpoint.has_model(model) is not False]
+            candidates = with_model or candidates
+            loaded = [endpoint for endpoint in candidates if model in endpoint.loaded]
+            candidates = loaded or candidates
+
+        return min(candidates, key=lambda endpoint: (endpoint.outstanding, endpoint.requests))
+
+    def _mark_failure(self, endpoint: Endpoint):
+        with self._lock:
+            endpoint.failures += 1
+            endpoint.consecutive_failures += 1
+            if endpoint.consecutive_failures >= self.config["unhealthy_after"]:
+                endpoint.unhealthy_until = time.time() + self.config["retry_unhealthy_s"]
+                print(f"⚠️  Endpoint de Ollama {endpoint.url} marcado como no disponible")
+
+    def _release(self, endpoint: Endpoint):
+        with self._lock:
+            endpoint.outstanding = max(0, endpoint.outstanding - 1)
+
+    def _send(self, endpoint: Endpoint, method: str, path: str, **kwargs) -> requests.Response:
+        """Enviar un request reintentando una vez si Ollama cerró una conexión reutilizada"""
+        try:
+            return self.session.request(method, self.url(path, endpoint), **kwargs)
+        except requests.exceptions.ConnectionError as e:
+            if isinstance(e, requests.exceptions.Timeout):
+                raise
+            # Conexión keep-alive cerrada por el servidor (reset): reintentar con una nueva
+            return self.session.request(method, self.url(path, endpoint), **kwargs)
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        payload = kwargs.get('json')
+        model = payload.get('model') if isinstance(payload, dict) else None
+        tried = []
+        last_error = None
+
+        while True:
+            with self._lock:
+                endpoint = self._pick(model, exclude=tried)
+                if endpoint is None:
+                    # Todos los endpoints rechazaron la conexión
+                    raise last_error
+                endpoint.outstanding += 1
+                endpoint.requests += 1
+            tried.append(endpoint)
+
+            try:
+                response = self._send(endpoint, method, path, **kwargs)
+            except requests.exceptions.ConnectionError as e:
+                self._release(endpoint)
+                if isinstance(e, requests.exceptions.Timeout):
+                    raise
+                # El host no acepta conexiones: probar con otro endpoint del pool
+                self._mark_failure(endpoint)
+                last_error = e
+                continue
+            except Exception:
+                self._release(endpoint)
+                raise
+
+            with self._lock:
+                endpoint.consecutive_failures = 0
+                endpoint.unhealthy_until = 0.0
+                if model and response.status_code == 200:
+                    endpoint.loaded.add(model)
+
+            if kwargs.get('stream'):
+                # El request sigue en curso hasta que se cierre el stream
+                close = response.close
+
+                def release_on_close():
+                    if not getattr(response, '_endpoint_released', False):
+                        response._endpoint_released = True
+                        self._release(endpoint)
+                    close()
+                response.close = release_on_close
+            else:
+                self._release(endpoint)
+            return response
+
+    def post_to(self, endpoint: Endpoint, path: str, **kwargs) -> requests.Response:
+        """POST a un endpoint concreto del pool (p. ej. para precargar un modelo en cada host)"""
+        payload = kwargs.get('json')
+        model = payload.get('model') if isinstance(payload, dict) else None
+        with self._lock:
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+        try:
+            response = self._send(endpoint, 'POST', path, **kwargs)
+        except requests.exceptions.ConnectionError:
+            self._mark_failure(endpoint)
+            raise
+        finally:
+            self._release(endpoint)
+        if model and response.status_code == 200:
+            with self._lock:
+                endpoint.loaded.add(model)
+        return response
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.request('POST', path, **kwargs)
+
+    def refresh_models(self, force: bool = False):
+        """Actualizar modelos instalados (/api/tags) y cargados (/api/ps) de cada endpoint"""
+        now = time.time()
+        for endpoint in self.endpoints:
+            if not force and now - endpoint.models_checked_at < self.config["models_refresh_s"]:
+                continue
+            endpoint.models_checked_at = now
+            try:
+                tags = self.session.get(self.url("/api/tags", endpoint), timeout=2)
+                if tags.status_code == 200:
+                    endpoint.installed = _model_names(tags.json().get('models', []))
+                ps = self.session.get(self.url("/api/ps", endpoint), timeout=2)
+                if ps.status_code == 200:
+                    endpoint.loaded = _model_names(ps.json().get('models', []))
+                with self._lock:
+                    endpoint.consecutive_failures = 0
+                    endpoint.unhealthy_until = 0.0
+            except requests.exceptions.RequestException:
+                self._mark_failure(endpoint)
+
+    def start_refresh(self):
+        """Actualizar los modelos de cada endpoint en un hilo de fondo cada models_refresh_s"""
+        with self._lock:
+            if self._refresher is not None:
+                return
+            self._refresher = threading.Thread(target=self._refresh_loop, daemon=True,
+                                               name="ollama-models-refresh")
+        self._refresher.start()
+
+    def _refresh_loop(self):
+        while not self._stop_refresh.is_set():
+            try:
+                self.refresh_models(force=True)
+            except Exception as e:
+                print(f"Error actualizando los modelos de Ollama: {e}")
+            self._stop_refresh.wait(self.config["models_refresh_s"])
+
+    def close(self):
+        """Detener la actualización de fondo y cerrar la sesión HTTP"""
+        self._stop_refresh.set()
+        self.session.close()
+
+    def installed_models(self) -> Optional[Set[str]]:
+        """Unión de los modelos instalados en el pool según la última actualización (None si no se sabe)"""
+        known = [endpoint.installed for endpoint in self.endpoints if endpoint.installed is not None]
+        return set().union(*known) if known else None
+
+    def stats(self) -> List[dict]:
+        with self._lock:
+            return [endpoint.stats() for endpoint in self.endpoints]
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_ollama_client() -> OllamaClient:
+    """Cliente compartido por el chatbot y los endpoints de la API"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OllamaClient()
+                _client.start_refresh()
+    return _client
+
+
+def reset_ollama_client():
+    """Descartar el cliente compartido (p. ej. después de cambiar OLLAMA_URL en pruebas)"""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
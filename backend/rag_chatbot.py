@@ -1,13 +1,39 @@
 import os
 import re
-from typing import List, Dict, Any
-from sentence_transformers import SentenceTransformer, CrossEncoder
+from typing import List, Dict, Any, Optional
+from sentence_transformers import SentenceTransformer
 from chromadb import PersistentClient
 import requests
 from bs4 import BeautifulSoup
 import urllib.parse
 import time
+import threading
 import json
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, wait
+from requests.adapters import HTTPAdapter
+from reranker import CrossEncoderReranker
+from context_selection import mmr_select, pack_context, count_tokens, trim_to_sentences
+from adaptive_retrieval import load_thresholds, is_confident, is_flat, needs_web_search
+from intent_classifier import IntentClassifier, classify_by_keywords
+from faq_fastpath import FAQIndex
+from extractive_answer import ExtractiveAnswerer
+from deadline import Deadline
+from stage_scheduler import StageScheduler
+from session_store import SessionStore, session_turn
+from single_flight import SingleFlight, normalize_question
+from ollama_client import get_ollama_client
+from model_router import ModelRouter
+from generation_profiles import GenerationProfiles, close_code_fence, base_options
+from circuit_breaker import CircuitBreaker
+from llm_telemetry import LLMTelemetry
+from web_cache import WebCache
+from html_extract import read_limited, extract_text
+from web_enrichment import WebEnricher
+from admission_control import AdmissionController, AdmissionRejected, Ticket
+from config import (RETRIEVAL_CONFIG, CHATBOT_CONFIG, DEADLINE_CONFIG, RERANK_CONFIG, OLLAMA_CONFIG,
+                    SESSION_CONFIG, GENERATION_STOP, FAQ_CONFIG, SINGLE_FLIGHT_CONFIG, WEB_SEARCH_CONFIG, WEB_CACHE_CONFIG,
+                    WEB_ENRICHMENT_CONFIG, ADMISSION_CONFIG)
 
 class RAGChatbot:
     def __init__(self, db_path: str = "./vector_db"):
@@ -25,8 +51,22 @@ class RAGChatbot:
         # Modelo de embeddings para recuperación
         self.embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
         
-        # Cross-encoder para re-ranking (mejora la calidad de resultados)
-        self.cross_encoder = CrossEncoder("cross-encoder/ms-marco-MiniLM-L-6-v2")
+        # Clasificador de intención con centroides precalculados
+        self.intent_classifier = IntentClassifier(self.embedding_model)
+        
+        # Respuestas curadas indexadas por embedding (camino rápido)
+        self.faq = FAQIndex(self.embedding_model)
+        
+        # Respuestas extractivas sin LLM (modo por request y fallback automático)
+        self.extractive = ExtractiveAnswerer(self.embedding_model)
+        
+        # Umbrales de distancia calibrados offline (evaluation_metrics.py --calibrate)
+        self.retrieval_thresholds = load_thresholds()
+        
+        # Cross-encoder para re-ranking (se carga en segundo plano desde el inicio)
+        self.reranker = CrossEncoderReranker()
+        if RERANK_CONFIG["enabled"]:
+            self.reranker.load_async()
         
         # Inicializar Ollama
         self.ollama = OllamaLLM()
@@ -34,62 +74,45 @@ class RAGChatbot:
         # Inicializar buscador web
         self.web_searcher = WebSearcher()
         
-    def classify_question(self, question: str) -> str:
-        """Clasificar el tipo de pregunta para usar el prompt apropiado"""
-        question_lower = question.lower()
-        
-        # Palabras clave para ejemplos de código
-        code_keywords = [
-            'ejemplo', 'código', 'implementar', 'cómo hacer', 'muestra', 'muéstrame',
-            'dame', 'déjame', 'quiero ver', 'necesito', 'ayúdame con', 'cómo crear',
-            'programa', 'aplicación', 'proyecto', 'sample', 'demo', 'tutorial',
-            'ver', 'mostrar', 'enseñar', 'enseñame', 'ejemplifica', 'ilustra',
-            'código de', 'ejemplo de', 'muestra de', 'cómo se hace', 'cómo se crea',
-            'cómo implementar', 'cómo usar', 'cómo trabajar con'
-        ]
+        # Planificador de etapas especulativas (búsqueda web en paralelo)
+        self.scheduler = StageScheduler()
         
-        # Palabras clave para ciclos específicos
-        loop_keywords = [
-            'for', 'while', 'do while', 'foreach', 'bucle', 'ciclo', 'loop',
-            'iterar', 'iteración', 'repetir', 'recorrer', 'contador'
-        ]
+        # Búsqueda web en segundo plano (modo answer_first)
+        self.enricher = WebEnricher(self.web_searcher)
         
-        # Palabras clave para bases de datos
-        db_keywords = [
-            'base de datos', 'database', 'sql', 'conectar', 'conexión', 'entity framework',
-            'ado.net', 'linq', 'query', 'consulta', 'tabla', 'registro', 'insertar',
-            'actualizar', 'eliminar', 'select', 'insert', 'update', 'delete'
-        ]
+        # Sesiones multi-turno (LRU + TTL en memoria)
+        self.sessions = SessionStore()
         
-        # Palabras clave para patrones de diseño
-        pattern_keywords = [
-            'patrón', 'pattern', 'singleton', 'factory', 'observer', 'strategy',
-            'command', 'adapter', 'decorator', 'facade', 'proxy', 'template method',
-            'builder', 'prototype', 'chain of responsibility', 'mediator', 'memento'
-        ]
+        # Coalescing de preguntas idénticas en curso
+        self.single_flight = SingleFlight()
         
-        # Clasificar la pregunta
-        if any(word in question_lower for word in loop_keywords):
-            return 'loop_specific'
-        elif any(word in question_lower for word in db_keywords):
-            return 'database_specific'
-        elif any(word in question_lower for word in pattern_keywords):
-            return 'pattern_specific'
-        elif any(word in question_lower for word in code_keywords):
-            return 'code_example'
-        else:
-            return 'general_help'
+        # Cola acotada delante de la generación con Ollama
+        self.admission = AdmissionController()
+        
+    def classify_question(self, question: str, query_embedding: List[float] = None) -> str:
+        """Clasificar el tipo de pregunta para usar el prompt apropiado"""
+        # Reutilizar el embedding de la recuperación: un producto matriz-vector con los centroides
+        if query_embedding is not None:
+            return self.intent_classifier.classify(question, query_embedding)
+        return classify_by_keywords(question)
+    
+    def embed_query(self, query: str) -> List[float]:
+        """Generar el embedding de la consulta (se reutiliza en todo el pipeline)"""
+        return self.embedding_model.encode(query).tolist()
     
-    def retrieve_relevant_chunks(self, query: str, n_results: int = 5) -> List[Dict[str, Any]]:
+    def retrieve_relevant_chunks(self, query: str, n_results: int = 5,
+                                 query_embedding: List[float] = None) -> List[Dict[str, Any]]:
         """Recuperar chunks relevantes de la base de datos vectorial"""
         try:
-            # Generar embedding de la consulta
-            query_embedding = self.embedding_model.encode(query).tolist()
+            # Generar embedding de la consulta si no se recibió
+            if query_embedding is None:
+                query_embedding = self.embed_query(query)
             
-            # Buscar en la base de datos
+            # Buscar en la base de datos (con embeddings para la selección MMR)
             results = self.collection.query(
                 query_embeddings=[query_embedding],
-                n_results=n_results
+                n_results=n_results,
+                include=['documents', 'metadatas', 'distances', 'embeddings']
             )
             
             # Procesar resultados
@@ -97,9 +120,11 @@ class RAGChatbot:
             if results['documents'] and results['documents'][0]:
                 for i, doc in enumerate(results['documents'][0]):
                     chunk = {
+                        'id': results['ids'][0][i] if results.get('ids') and results['ids'][0] else None,
                         'content': doc,
                         'metadata': results['metadatas'][0][i] if results['metadatas'] and results['metadatas'][0] else {},
-                        'distance': results['distances'][0][i] if results['distances'] and results['distances'][0] else 0
+                        'distance': results['distances'][0][i] if results['distances'] and results['distances'][0] else 0,
+                        'embedding': results['embeddings'][0][i] if results.get('embeddings') is not None and len(results['embeddings'][0]) > i else None
                     }
                     chunks.append(chunk)
             
@@ -109,243 +134,371 @@ class RAGChatbot:
             print(f"Error recuperando chunks: {e}")
             return []
     
-    def clean_context(self, chunks: List[Dict[str, Any]]) -> str:
-        """Limpiar y formatear el contexto de los chunks"""
+    def retrieve_adaptive(self, query: str, query_embedding: List[float] = None) -> List[Dict[str, Any]]:
+        """Recuperar con profundidad adaptativa según las distancias devueltas.
+        
+        Se empieza con pocos resultados; solo se amplía la búsqueda cuando el
+        mejor resultado no es confiable y las distancias no separan candidatos.
+        """
+        chunks = self.retrieve_relevant_chunks(query, RETRIEVAL_CONFIG["initial_n_results"], query_embedding)
+        if is_confident(chunks, self.retrieval_thresholds):
+            return chunks
+        if is_flat(chunks, self.retrieval_thresholds):
+            print("Distancias planas, ampliando la búsqueda...")
+            return self.retrieve_relevant_chunks(query, RETRIEVAL_CONFIG["max_n_results"], query_embedding)
+        return chunks
+    
+    def select_context_chunks(self, chunks: List[Dict[str, Any]],
+                              query_embedding: List[float] = None) -> List[Dict[str, Any]]:
+        """Seleccionar los chunks de contexto en orden de relevancia"""
         if not chunks:
-            return ""
+            return []
         
-        # Ordenar por relevancia (menor distancia = más relevante)
-        chunks.sort(key=lambda x: x.get('distance', 1.0))
+        # Selección MMR: relevancia sin párrafos casi idénticos de guías solapadas
+        if query_embedding is not None:
+            selected = mmr_select(query_embedding, chunks)
+            if selected:
+                return selected
         
-        # Tomar los 3 chunks más relevantes
-        top_chunks = chunks[:3]
+        # Ordenar por relevancia: score del re-ranking si existe, si no menor distancia
+        if any('rerank_score' in chunk for chunk in chunks):
+            chunks.sort(key=lambda x: x.get('rerank_score', float('-inf')), reverse=True)
+        else:
+            chunks.sort(key=lambda x: x.get('distance', 1.0))
         
-        context_parts = []
-        for chunk in top_chunks:
-            content = chunk.get('content', '')
-            if content and len(content.strip()) > 50:  # Solo chunks con contenido significativo
-                context_parts.append(content.strip())
+        # Tomar los 3 chunks más relevantes con contenido significativo
+        return [chunk for chunk in chunks[:3]
+                if chunk.get('content') and len(chunk['content'].strip()) > 50]
+    
+    def clean_context(self, chunks: List[Dict[str, Any]], query_embedding: List[float] = None) -> str:
+        """Limpiar y formatear el contexto de los chunks"""
+        selected = self.select_context_chunks(chunks, query_embedding)
+        return "\n\n".join(chunk['content'].strip() for chunk in selected)
+    
+    def chat(self, question: str, mode: str = None, deadline: Deadline = None, session_id: str = None) -> str:
+        """Método principal para chatear con el bot (siempre devuelve texto).
         
-        return "\n\n".join(context_parts)
+        Si la cola de generación rechaza la pregunta se devuelve un aviso; los
+        endpoints HTTP usan chat_with_details para responder 429/503.
+        """
+        try:
+            return self.chat_with_details(question, mode, deadline, session_id)['response']
+        except AdmissionRejected as e:
+            return f"El servidor está ocupado ({e.reason}). Intenta de nuevo en {e.retry_after_s} segundos."
+    
+    def is_same_topic(self, session: Dict[str, Any], query_embedding: List[float]) -> bool:
+        """La pregunta sigue el tema del turno anterior de la sesión"""
+        if session['last_embedding'] is None or not session['last_chunks']:
+            return False
+        current = np.asarray(query_embedding, dtype=np.float32)
+        previous = np.asarray(session['last_embedding'], dtype=np.float32)
+        similarity = float(current @ previous / ((np.linalg.norm(current) * np.linalg.norm(previous)) or 1.0))
+        return similarity >= SESSION_CONFIG["topic_similarity"]
     
-    def chat(self, question: str) -> str:
-        """Método principal para chatear con el bot"""
+    def prepare_answer(self, question: str, mode: str = None, deadline: Deadline = None,
+                       session: Dict[str, Any] = None):
+        """Ejecutar el pipeline hasta antes de la generación.
+        
+        Devuelve (details, state): si details['response'] ya tiene la respuesta
+        (FAQ, modo extractivo o error) state es None; si no, state contiene el
+        contexto empaquetado para generar con Ollama.
+        """
+        mode = mode or CHATBOT_CONFIG["default_mode"]
+        deadline = deadline or Deadline()
+        details = {'response': '', 'question_type': None, 'fast_path': False, 'mode': mode,
+                   'sources': [], 'timings': {}}
         try:
             print(f"Procesando pregunta: {question}")
             
+            # Embedding de la pregunta (compartido por FAQ, clasificación y recuperación)
+            query_embedding = self.embed_query(question)
+            
+            # Respuesta curada: se sirve sin recuperación ni LLM
+            faq_match = self.faq.match(query_embedding)
+            if faq_match:
+                print(f"Respuesta rápida desde FAQ: {faq_match['id']} ({faq_match['similarity']:.2f})")
+                details.update(response=faq_match['answer'], fast_path=True, faq_id=faq_match['id'])
+                details['timings']['prepare_ms'] = round(deadline.elapsed() * 1000)
+                return details, None
+            
             # Clasificar la pregunta
-            question_type = self.classify_question(question)
+            question_type = self.classify_question(question, query_embedding)
+            details['question_type'] = question_type
             print(f"Tipo de pregunta detectado: {question_type}")
             
-            # Buscar información local
-            local_chunks = self.retrieve_relevant_chunks(question, n_results=5)
-            local_context = self.clean_context(local_chunks)
+            # Seguimiento sobre el mismo tema: reutilizar la recuperación del turno anterior
+            reuse = session is not None and self.is_same_topic(session, query_embedding)
+            web_future = None
+            if reuse:
+                print("Pregunta de seguimiento: reutilizando el contexto del turno anterior")
+                details['reused_retrieval'] = True
+                local_chunks = session['last_chunks']
+                selected_chunks = session['last_selected']
+            else:
+                # Iniciar la búsqueda web especulativamente si suele hacer falta
+                if (mode != 'extractive'
+                        and not WEB_ENRICHMENT_CONFIG["answer_first"]
+                        and deadline.has_time_for(DEADLINE_CONFIG["web_search_min_s"])
+                        and self.web_searcher.is_csharp_related(question)
+                        and self.scheduler.should_speculate(question_type)):
+                    web_future = self.scheduler.start(self.web_searcher.search_web, question, 2, deadline)
+                
+                # Buscar información local
+                local_chunks = self.retrieve_adaptive(question, query_embedding)
+                rerank_budget_ms = min(RERANK_CONFIG["budget_ms"], deadline.remaining() * 1000 / 10)
+                local_chunks = self.reranker.rerank(question, local_chunks, budget_ms=rerank_budget_ms)
+                selected_chunks = self.select_context_chunks(local_chunks, query_embedding)
+            local_context = "\n\n".join(chunk['content'].strip() for chunk in selected_chunks)
+            details['sources'] = [
+                {'file': chunk['metadata'].get('file'), 'title': chunk['metadata'].get('title')}
+                for chunk in selected_chunks if chunk.get('metadata')
+            ]
+            details['timings']['retrieval_ms'] = round(deadline.elapsed() * 1000)
+            
+            # Sin tiempo suficiente para generar: degradar a modo extractivo
+            if mode != 'extractive' and not deadline.has_time_for(DEADLINE_CONFIG["min_generation_s"]):
+                print("Presupuesto de tiempo insuficiente para generar, usando modo extractivo")
+                mode = 'extractive'
+                details['mode'] = mode
+                details['degraded'] = True
+            
+            # Modo extractivo: respuesta armada con el contexto local, sin web ni LLM
+            if mode == 'extractive':
+                if web_future is not None:
+                    # La especulación se cuenta como descartada (y se cancela si no empezó)
+                    self.scheduler.resolve(question_type, web_future, needed=False)
+                response = self.extractive.answer(question, local_chunks, query_embedding)
+                details['response'] = response or self.generate_local_fallback(question, local_context,
+                                                                               query_embedding=query_embedding)
+                details['timings']['prepare_ms'] = round(deadline.elapsed() * 1000)
+                return details, None
+            
+            if reuse:
+                # El contexto ya está en el 'context' de Ollama de la sesión; si no, se reenvía
+                full_context = "" if session['ollama_context'] else session['last_context']
+            else:
+                # Buscar información web solo si el contexto local no es confiable
+                web_results = []
+                web_needed = not local_context or needs_web_search(local_chunks, self.retrieval_thresholds)
+                if web_future is not None:
+                    # Resultado especulativo: se usa si hace falta, si no se descarta
+                    web_results = self.scheduler.resolve(
+                        question_type, web_future, web_needed,
+                        timeout=deadline.timeout(DEADLINE_CONFIG["max_budget_s"], DEADLINE_CONFIG["generation_reserve_s"])
+                    ) or []
+                elif web_needed:
+                    self.scheduler.resolve(question_type, None, needed=True)
+                    if WEB_ENRICHMENT_CONFIG["answer_first"]:
+                        # Responder ya con lo que haya en el cache web y buscar el resto en segundo plano
+                        web_results = self.web_searcher.search_web(question, max_results=2, deadline=deadline,
+                                                                   cache_only=True)
+                        if web_results:
+                            details['enrichment'] = 'cached'
+                        elif self.web_searcher.is_csharp_related(question) and self.enricher.enrich(question):
+                            details['enrichment'] = 'scheduled'
+                    elif deadline.has_time_for(DEADLINE_CONFIG["web_search_min_s"]):
+                        print("Buscando información web...")
+                        web_results = self.web_searcher.search_web(question, max_results=2, deadline=deadline)
+                    else:
+                        print("Búsqueda web omitida por presupuesto de tiempo")
+                        details['degraded'] = True
+                else:
+                    self.scheduler.resolve(question_type, None, needed=False)
+                details['sources'] += [{'url': result['url'], 'title': result['title']} for result in web_results]
+                
+                # Empaquetar contexto local y web dentro del presupuesto de tokens
+                pieces = [chunk['content'] for chunk in selected_chunks]
+                pieces += [result['content'] for result in web_results]
+                packed = pack_context(pieces, question_type)
+                print(f"Contexto: {packed['tokens']}/{packed['budget']} tokens en {packed['pieces']} fragmentos")
+                details['context_tokens'] = packed['tokens']
+                full_context = packed['context']
+                
+                if session is not None:
+                    session.update(last_embedding=query_embedding, last_chunks=local_chunks,
+                                   last_selected=selected_chunks, last_context=full_context)
             
-            # Buscar información web si es necesario
-            web_context = ""
-            if not local_context or len(local_context) < 100:
-                print("Buscando información web...")
-                web_results = self.web_searcher.search_web(question, max_results=2)
-                if web_results:
-                    web_context = "\n\n".join([result['content'] for result in web_results])
+            details['timings']['prepare_ms'] = round(deadline.elapsed() * 1000)
             
-            # Combinar contextos
-            full_context = f"{local_context}\n\n{web_context}".strip()
+            state = {
+                'context': full_context,
+                'local_chunks': local_chunks,
+                'query_embedding': query_embedding,
+                'deadline': deadline,
+                'session': session
+            }
+            return details, state
             
+        except Exception as e:
+            print(f"Error en chat: {e}")
+            details['response'] = f"Lo siento, tuve un problema procesando tu pregunta. Error: {str(e)}"
+            return details, None
+    
+    def admit(self, deadline: Deadline, details: Dict[str, Any]) -> Optional[Ticket]:
+        """Pedir lugar en la generación (lanza AdmissionRejected: 429 cola llena, 503 espera agotada).
+        
+        Solo se llama cuando la respuesta va a Ollama: FAQ, recuperación, web y modo
+        extractivo no ocupan la cola.
+        """
+        if not ADMISSION_CONFIG["enabled"]:
+            return None
+        ticket = self.admission.acquire(deadline.remaining() - DEADLINE_CONFIG["min_generation_s"])
+        details['timings']['queue_ms'] = round(ticket.wait_s * 1000)
+        return ticket
+    
+    def coalescing_key(self, kind: str, question: str, mode: str = None) -> tuple:
+        """Clave de single-flight para requests sin sesión ('chat' o 'stream')"""
+        return (kind, mode or CHATBOT_CONFIG["default_mode"], normalize_question(question))
+    
+    def chat_with_details(self, question: str, mode: str = None, deadline: Deadline = None,
+                          session_id: str = None) -> Dict[str, Any]:
+        """Responder la pregunta devolviendo también metadatos de cómo se respondió.
+        
+        mode: "generative" (Ollama) o "extractive" (sin LLM, a partir del contexto local)
+        deadline: presupuesto de tiempo del request; cada etapa recibe lo que queda y
+        el chatbot se degrada (sin web, menos tokens, extractivo) antes que excederlo.
+        session_id: conversación multi-turno; reutiliza el contexto de Ollama y la
+        recuperación del turno anterior cuando la pregunta sigue el mismo tema.
+        """
+        session = self.sessions.get(session_id) if session_id else None
+        if session is None:
+            if not SINGLE_FLIGHT_CONFIG["enabled"]:
+                return self._chat_turn(question, mode, deadline, None)
+            # Preguntas idénticas en curso: una sola recuperación y generación
+            key = self.coalescing_key('chat', question, mode)
+            timeout = deadline.remaining() if deadline else None
+            details, shared = self.single_flight.do(key, lambda: self._chat_turn(question, mode, deadline, None),
+                                                    timeout=timeout)
+            return {**details, 'coalesced': True} if shared else details
+        # Un turno a la vez por sesión, sin esperar más que el presupuesto del request
+        with session_turn(session, deadline.remaining() if deadline else DEADLINE_CONFIG["max_budget_s"]):
+            details = self._chat_turn(question, mode, deadline, session)
+        details['session_id'] = session_id
+        return details
+    
+    def _chat_turn(self, question: str, mode: str, deadline: Deadline, session: Dict[str, Any]) -> Dict[str, Any]:
+        details, state = self.prepare_answer(question, mode, deadline, session)
+        if state is None:
+            if session is not None:
+                self.sessions.record_turn(session, question, details['response'])
+            return details
+        
+        deadline = state['deadline']
+        result = {}
+        ticket = self.admit(deadline, details)
+        try:
             # Generar respuesta con Ollama
-            response = self.ollama.generate_response(question, full_context, question_type)
+            try:
+                response = self.ollama.generate_response(question, state['context'], details['question_type'],
+                                                         deadline=deadline, session=session, result=result)
+            finally:
+                if ticket:
+                    ticket.release()
             
             if not response or len(response) < 20:
-                # Fallback local
-                response = self.generate_local_fallback(question, full_context)
-            
-            return response
+                # Fallback local: respuesta extractiva del contexto o respuesta curada
+                response = self.generate_local_fallback(question, state['context'],
+                                                        state['local_chunks'], state['query_embedding'])
+                details['mode'] = 'fallback'
             
+            details['response'] = response
         except Exception as e:
             print(f"Error en chat: {e}")
-            return f"Lo siento, tuve un problema procesando tu pregunta. Error: {str(e)}"
+            details['response'] = f"Lo siento, tuve un problema procesando tu pregunta. Error: {str(e)}"
+        
+        if session is not None:
+            self.sessions.record_turn(session, question, details['response'], result.get('context'), result.get('model'))
+        details['timings']['total_ms'] = round(deadline.elapsed() * 1000)
+        return details
     
-    def generate_local_fallback(self, question: str, context: str = "") -> str:
-        """Generar respuesta local cuando Ollama falla"""
-        question_lower = question.lower()
+    def chat_stream(self, question: str, mode: str = None, deadline: Deadline = None, session_id: str = None):
+        """Generador de eventos: primero metadatos, luego tokens a medida que Ollama los produce.
         
-        # Respuestas específicas para preguntas comunes
-        if any(word in question_lower for word in ['hola mundo', 'hello world', 'primer programa']):
-            return """**Hola Mundo en C#**
-
-Aquí tienes un ejemplo simple de "Hola Mundo" en C#:
-
-```csharp
-using System;
-
-namespace MiPrimerPrograma
-{
-    class Program
-    {
-        static void Main(string[] args)
-        {
-            Console.WriteLine("¡Hola Mundo desde C#!");
-        }
-    }
-}
-```
-
-**Para ejecutarlo:**
-1. Guarda el código en un archivo `Program.cs`
-2. Abre una terminal en la carpeta del archivo
-3. Ejecuta: `dotnet run`
-
-¡Es así de simple!"""
+        Eventos: {'type': 'metadata', ...}, {'type': 'token', 'content': str},
+        {'type': 'done', 'mode': str, 'timings': dict}
+        """
+        session = self.sessions.get(session_id) if session_id else None
+        if session is None:
+            if not SINGLE_FLIGHT_CONFIG["enabled"]:
+                yield from self._stream_turn(question, mode, deadline, None)
+                return
+            # Streams idénticos en curso comparten los mismos tokens
+            key = self.coalescing_key('stream', question, mode)
+            for event, shared in self.single_flight.stream(key, lambda: self._stream_turn(question, mode, deadline, None)):
+                if shared and event['type'] == 'metadata':
+                    event = {**event, 'coalesced': True}
+                yield event
+            return
+        with session_turn(session, deadline.remaining() if deadline else DEADLINE_CONFIG["max_budget_s"]):
+            yield from self._stream_turn(question, mode, deadline, session)
+    
+    def _stream_turn(self, question: str, mode: str, deadline: Deadline, session: Dict[str, Any]):
+        details, state = self.prepare_answer(question, mode, deadline, session)
+        # El rechazo (AdmissionRejected) sale antes del primer evento
+        ticket = self.admit(state['deadline'], details) if state is not None else None
+        metadata = {key: value for key, value in details.items() if key != 'response'}
+        if session is not None:
+            metadata['session_id'] = session['id']
         
-        elif any(word in question_lower for word in ['for', 'bucle', 'ciclo', 'loop']):
-            return """**Bucle FOR en C#**
-
-El bucle `for` es una estructura de control que permite ejecutar código un número específico de veces.
-
-**Sintaxis básica:**
-```csharp
-for (inicialización; condición; incremento)
-{
-    // Código a ejecutar
-}
-```
-
-**Ejemplos prácticos:**
-```csharp
-// Imprimir números del 1 al 10
-for (int i = 1; i <= 10; i++)
-{
-    Console.WriteLine($"Número: {i}");
-}
-
-// Recorrer un array
-string[] frutas = {"manzana", "banana", "naranja"};
-for (int i = 0; i < frutas.Length; i++)
-{
-    Console.WriteLine($"Fruta {i + 1}: {frutas[i]}");
-}
-
-// Bucle descendente
-for (int i = 10; i >= 1; i--)
-{
-    Console.WriteLine($"Cuenta regresiva: {i}");
-}
-```
-
-**Cuándo usar FOR:**
-- Cuando conoces el número exacto de iteraciones
-- Para recorrer arrays o colecciones por índice
-- Cuando necesitas control sobre el contador"""
+        try:
+            yield {'type': 'metadata', **metadata}
+            
+            if state is None:
+                if session is not None:
+                    self.sessions.record_turn(session, question, details['response'])
+                yield {'type': 'token', 'content': details['response']}
+                yield {'type': 'done', 'mode': details['mode'], 'timings': details['timings']}
+                return
+            
+            deadline = state['deadline']
+            generated = []
+            result = {}
+            try:
+                for token in self.ollama.generate_stream(question, state['context'], details['question_type'],
+                                                         deadline=deadline, session=session, result=result):
+                    if not generated:
+                        details['timings']['first_token_ms'] = round(deadline.elapsed() * 1000)
+                    generated.append(token)
+                    yield {'type': 'token', 'content': token}
+            except Exception as e:
+                print(f"Error en streaming: {e}")
+        finally:
+            # También si el cliente se desconecta a mitad del stream
+            if ticket:
+                ticket.release()
         
-        elif any(word in question_lower for word in ['while', 'mientras']):
-            return """**Bucle WHILE en C#**
-
-El bucle `while` ejecuta código mientras una condición sea verdadera.
-
-**Sintaxis básica:**
-```csharp
-while (condición)
-{
-    // Código a ejecutar
-}
-```
-
-**Ejemplos prácticos:**
-```csharp
-// Contador simple
-int contador = 0;
-while (contador < 5)
-{
-    Console.WriteLine($"Contador: {contador}");
-    contador++;
-}
-
-// Leer entrada del usuario hasta que sea válida
-string entrada;
-do
-{
-    Console.Write("Ingresa 'salir' para terminar: ");
-    entrada = Console.ReadLine();
-    Console.WriteLine($"Escribiste: {entrada}");
-} while (entrada.ToLower() != "salir");
-```
-
-**Cuándo usar WHILE:**
-- Cuando no conoces el número exacto de iteraciones
-- Para validación de entrada
-- Cuando necesitas ejecutar código al menos una vez (do-while)"""
+        response = "".join(generated)
+        if len(response) < 20:
+            # Fallback local si Ollama no produjo una respuesta útil
+            response = self.generate_local_fallback(question, state['context'],
+                                                    state['local_chunks'], state['query_embedding'])
+            details['mode'] = 'fallback'
+            yield {'type': 'token', 'content': response}
         
-        elif any(word in question_lower for word in ['base de datos', 'database', 'sql', 'conectar', 'conexión']):
-            return """**Conexión a Base de Datos en C#**
-
-Para conectar a una base de datos SQL Server en C#:
-
-**Usando ADO.NET:**
-```csharp
-using System.Data.SqlClient;
-
-string connectionString = "Server=miServidor;Database=miBaseDatos;Trusted_Connection=true;";
-
-using (SqlConnection connection = new SqlConnection(connectionString))
-{
-    connection.Open();
-    Console.WriteLine("Conexión exitosa!");
+        if session is not None:
+            self.sessions.record_turn(session, question, response, result.get('context'), result.get('model'))
+        details['timings']['total_ms'] = round(deadline.elapsed() * 1000)
+        yield {'type': 'done', 'mode': details['mode'], 'timings': details['timings']}
     
-    string query = "SELECT * FROM Usuarios";
-    using (SqlCommand command = new SqlCommand(query, connection))
-    {
-        using (SqlDataReader reader = command.ExecuteReader())
-        {
-            while (reader.Read())
-            {
-                Console.WriteLine($"ID: {reader["ID"]}, Nombre: {reader["Nombre"]}");
-            }
-        }
-    }
-}
-```
-
-**Usando Entity Framework Core:**
-```csharp
-// En appsettings.json
-{
-  "ConnectionStrings": {
-    "DefaultConnection": "Server=miServidor;Database=miBaseDatos;Trusted_Connection=true;"
-  }
-}
-
-// En Startup.cs
-services.AddDbContext<MiContexto>(options =>
-    options.UseSqlServer(Configuration.GetConnectionString("DefaultConnection")));
-```"""
+    def generate_local_fallback(self, question: str, context: str = "",
+                                chunks: List[Dict[str, Any]] = None, query_embedding: List[float] = None) -> str:
+        """Generar respuesta local cuando Ollama falla"""
+        if query_embedding is None:
+            query_embedding = self.embed_query(question)
         
-        elif any(word in question_lower for word in ['qué es', 'que es', 'definir', 'explicar']):
-            return """**C# y .NET**
-
-**C#** es un lenguaje de programación moderno, orientado a objetos y de propósito general desarrollado por Microsoft como parte de la plataforma .NET.
-
-**Características principales de C#:**
-- Tipado estático y seguro
-- Orientado a objetos
-- Garbage collection automático
-- LINQ para consultas de datos
-- Soporte para programación asíncrona
-- Multiplataforma
-
-**.NET** es una plataforma de desarrollo que incluye:
-- Common Language Runtime (CLR)
-- Framework Class Library (FCL)
-- Herramientas de desarrollo
-- Soporte para múltiples lenguajes
-
-**Ventajas:**
-- Excelente para desarrollo web con ASP.NET Core
-- Gran ecosistema de librerías
-- Soporte empresarial de Microsoft
-- Multiplataforma (Windows, Linux, macOS)"""
+        # Respuesta curada (faq/) por similitud de embeddings, con un umbral más permisivo
+        faq_match = self.faq.match(query_embedding, threshold=FAQ_CONFIG["fallback_threshold"])
+        if faq_match:
+            print(f"Fallback desde FAQ: {faq_match['id']} ({faq_match['similarity']:.2f})")
+            return faq_match['answer']
         
-        else:
-            return f"""Basándome en la información disponible:
+        # Respuesta extractiva con las oraciones y el código más relevantes
+        if chunks:
+            extractive = self.extractive.answer(question, chunks, query_embedding)
+            if extractive:
+                return extractive
+        
+        return f"""Basándome en la información disponible:
 
 {context[:300] if context else "No encontré información específica en mi base de datos local."}
 
@@ -373,8 +526,12 @@ services.AddDbContext<MiContexto>(options =>
                     continue
                 
                 print("\n🤖 CodeHelperNET está pensando...")
-                response = self.chat(question)
-                print(f"\n🤖 CodeHelperNET: {response}")
+                for event in self.chat_stream(question):
+                    if event['type'] == 'metadata':
+                        print("\n🤖 CodeHelperNET: ", end="", flush=True)
+                    elif event['type'] == 'token':
+                        print(event['content'], end="", flush=True)
+                print()
                 
             except KeyboardInterrupt:
                 print("\n👋 ¡Hasta luego!")
@@ -383,90 +540,288 @@ services.AddDbContext<MiContexto>(options =>
                 print(f"\n❌ Error: {e}")
 
 
-class OllamaLLM:
-    """Clase para usar Ollama localmente"""
-    
-    def __init__(self):
-        self.ollama_url = "http://localhost:11434"
-        self.model = "llama2"  # Puedes cambiar a "mistral", "codellama", etc.
-        
-    def generate_response(self, question: str, context: str = "", question_type: str = "general") -> str:
-        """Generar respuesta usando Ollama"""
-        try:
-            # Crear prompt específico para C# y .NET
-            if context:
-                prompt = f"""Eres un experto especializado en C# y .NET. Responde la siguiente pregunta de manera específica, clara y útil.
-
-Contexto disponible:
-{context}
-
-Pregunta: {question}
+# Prefijo estático del prompt: debe mantenerse idéntico entre requests
+PROMPT_PREFIX = """Eres un experto especializado en C# y .NET. Responde la pregunta del usuario de manera específica, clara y útil.
 
 Instrucciones:
 - Responde SOLO sobre C# y .NET
 - Si la pregunta es sobre sintaxis, proporciona ejemplos de código claros
 - Si es sobre conceptos, explica de manera didáctica
-- Usa el contexto proporcionado para enriquecer tu respuesta
+- Si hay contexto disponible, úsalo para enriquecer tu respuesta
 - Responde en español de manera natural y conversacional
 - Sé específico y directo
 - Incluye ejemplos prácticos cuando sea útil
 - Si es código, usa bloques de código con ```csharp
+"""
+
+
+class OllamaLLM:
+    """Clase para usar Ollama localmente"""
+    
+    def __init__(self):
+        self.client = get_ollama_client()
+        self.ollama_url = self.client.base_url
+        self.model = OLLAMA_CONFIG["model"]  # Modelo por defecto; el router elige por request
+        self.router = ModelRouter(self.client)
+        self.profiles = GenerationProfiles()
+        self.breaker = CircuitBreaker(self.probe)
+        self.telemetry = LLMTelemetry()
+        
+    def build_prompt(self, question: str, context: str = "", session: Dict[str, Any] = None) -> str:
+        """Construir el prompt específico para C# y .NET.
+        
+        El prefijo fijo (rol e instrucciones) va siempre primero y es idéntico en
+        todos los requests, para que Ollama reutilice su evaluación; el contexto
+        y la pregunta, que cambian, van al final.
+        """
+        # Seguimiento con 'context' de Ollama: el modelo ya leyó el prefijo y los turnos previos
+        if session is not None and session['ollama_context']:
+            extra = f"Contexto adicional:\n{context}\n\n" if context else ""
+            return f"""{extra}Pregunta de seguimiento: {question}
 
 Respuesta:"""
-            else:
-                prompt = f"""Eres un experto especializado en C# y .NET. Responde la siguiente pregunta de manera específica, clara y útil.
+        
+        history = self.format_history(session['history']) if session is not None else ""
+        if history:
+            history = f"Conversación previa:\n{history}\n\n"
+        if context:
+            return f"""{PROMPT_PREFIX}
+{history}Contexto disponible:
+{context}
 
 Pregunta: {question}
 
-Instrucciones:
-- Responde SOLO sobre C# y .NET
-- Si la pregunta es sobre sintaxis, proporciona ejemplos de código claros
-- Si es sobre conceptos, explica de manera didáctica
-- Responde en español de manera natural y conversacional
-- Sé específico y directo
-- Incluye ejemplos prácticos cuando sea útil
-- Si es código, usa bloques de código con ```csharp
-
 Respuesta:"""
+        return f"""{PROMPT_PREFIX}
+{history}Pregunta: {question}
 
-            payload = {
-                "model": self.model,
-                "prompt": prompt,
-                "stream": False,
-                "options": {
-                    "temperature": 0.7,
-                    "num_predict": 300,
-                    "top_p": 0.9,
-                    "top_k": 40
-                }
-            }
-            
-            response = requests.post(
-                f"{self.ollama_url}/api/generate",
+Respuesta:"""
+    
+    def format_history(self, history: List[tuple]) -> str:
+        """Turnos previos recortados al tope de tokens (los más recientes tienen prioridad)"""
+        remaining = SESSION_CONFIG["history_token_cap"]
+        turns = []
+        for question, answer in reversed(history):
+            turn = f"Usuario: {question}\nAsistente: {answer}"
+            tokens = count_tokens(turn)
+            if tokens > remaining:
+                turn = trim_to_sentences(turn, remaining)
+                if turn:
+                    turns.append(turn)
+                break
+            turns.append(turn)
+            remaining -= tokens
+        return "\n\n".join(reversed(turns))
+    
+    def build_payload(self, question: str, context: str = "", question_type: str = "general",
+                      deadline: Deadline = None, stream: bool = False, session: Dict[str, Any] = None):
+        """Armar el payload de /api/generate y el timeout según el tiempo que queda"""
+        prompt = self.build_prompt(question, context, session)
+        prompt_tokens = count_tokens(prompt)
+        
+        # Perfil de generación del tipo de pregunta (solo las claves que fija)
+        profile = self.profiles.options_for(question_type)
+        
+        # Ajustar timeout y longitud de la respuesta al tiempo que queda
+        timeout = OLLAMA_CONFIG["timeout"]
+        affordable = None
+        if deadline is not None:
+            timeout = deadline.timeout(timeout)
+            affordable = int(timeout * DEADLINE_CONFIG["estimated_tokens_per_s"])
+        
+        def cap(num_predict: int) -> int:
+            if affordable is None:
+                return num_predict
+            return max(DEADLINE_CONFIG["min_num_predict"], min(num_predict, affordable))
+        
+        # El 'context' de Ollama solo sirve con el modelo que lo generó
+        pinned = session.get('model') if session is not None and session['ollama_context'] else None
+        model = self.router.choose(question_type, prompt_tokens,
+                                   cap(profile.get("num_predict", OLLAMA_CONFIG["num_predict"])),
+                                   slo_ms=timeout * 1000, pinned=pinned)
+        print(f"Prompt final: {prompt_tokens} tokens, modelo {model}")
+
+        # Precedencia: OLLAMA_CONFIG, luego las opciones del modelo, luego lo que fija el perfil
+        options = {**base_options(), **self.router.options_for(model), **profile}
+        options["num_predict"] = cap(options["num_predict"])
+        options["stop"] = GENERATION_STOP + options.get("stop", [])
+        payload = {
+            "model": model,
+            "prompt": prompt,
+            "stream": stream,
+            "keep_alive": OLLAMA_CONFIG["keep_alive"],
+            "options": options
+        }
+        if session is not None and session['ollama_context']:
+            payload["context"] = session['ollama_context']
+        return payload, timeout
+    
+    def probe(self) -> bool:
+        """Sondeo liviano de salud usado por el circuit breaker"""
+        response = self.client.get("/api/tags", timeout=2)
+        return response.status_code == 200
+    
+    def warm_up(self) -> bool:
+        """Cargar los modelos a los que rutea el router y evaluar el prefijo fijo del prompt.
+        
+        Se precarga cada modelo en cada endpoint que lo tiene instalado (los hosts en
+        paralelo, los modelos de un host de a uno). True si todas las cargas funcionaron.
+        """
+        self.client.refresh_models(force=True)
+        models = self.router.routable_models()
+        
+        def warm_endpoint(endpoint) -> bool:
+            ok = True
+            for model in models:
+                if endpoint.has_model(model) is False:
+                    continue
+                try:
+                    start = time.time()
+                    response = self.client.post_to(endpoint, "/api/generate", json={
+                        "model": model,
+                        "prompt": PROMPT_PREFIX,
+                        "stream": False,
+                        "keep_alive": OLLAMA_CONFIG["keep_alive"],
+                        "options": {"num_predict": 1}
+                    }, timeout=OLLAMA_CONFIG["timeout"])
+                    if response.status_code == 200:
+                        print(f"Modelo {model} precargado en {endpoint.url} en {time.time() - start:.1f}s")
+                        continue
+                    print(f"Error precargando {model} en {endpoint.url}: {response.status_code} - {response.text}")
+                except Exception as e:
+                    print(f"No se pudo precargar el modelo {model} en {endpoint.url}: {e}")
+                ok = False
+            return ok
+        
+        with ThreadPoolExecutor(max_workers=len(self.client.endpoints)) as pool:
+            return all(pool.map(warm_endpoint, self.client.endpoints))
+    
+    def generate_response(self, question: str, context: str = "", question_type: str = "general",
+                          deadline: Deadline = None, session: Dict[str, Any] = None,
+                          result: Dict[str, Any] = None) -> str:
+        """Generar respuesta usando Ollama.
+        
+        Si se pasa result, se completa con la respuesta completa de Ollama
+        (incluido el array 'context' para continuar la conversación).
+        """
+        try:
+            payload, timeout = self.build_payload(question, context, question_type, deadline, session=session)
+        except Exception as e:
+            print(f"Error con Ollama: {e}")
+            return ""
+        
+        # Circuito abierto: fallar de inmediato hacia el fallback local
+        if not self.breaker.allow_request():
+            print("Circuito de Ollama abierto, usando fallback local")
+            return ""
+        
+        model = payload["model"]
+        data = None
+        start = time.time()
+        self.router.begin(model)
+        try:
+            response = self.client.post(
+                "/api/generate",
                 json=payload,
-                timeout=30
+                timeout=timeout
             )
             
             if response.status_code == 200:
-                result = response.json()
-                return result.get("response", "")
+                data = response.json()
+                self.breaker.record_success(time.time() - start)
+                if result is not None:
+                    result.update(data)
+                self.profiles.record(question_type, model, payload["options"]["num_predict"], data)
+                self.telemetry.record(question_type, model, data)
+                return close_code_fence(data.get("response", ""))
             else:
+                self.breaker.record_failure()
                 print(f"Error de Ollama: {response.status_code} - {response.text}")
                 return ""
             
         except Exception as e:
+            self.breaker.record_failure()
             print(f"Error con Ollama: {e}")
             return ""
+        finally:
+            self.router.end(model, data, time.time() - start)
+    
+    def generate_stream(self, question: str, context: str = "", question_type: str = "general",
+                        deadline: Deadline = None, session: Dict[str, Any] = None,
+                        result: Dict[str, Any] = None):
+        """Generar respuesta con Ollama entregando los tokens a medida que llegan"""
+        payload, timeout = self.build_payload(question, context, question_type, deadline,
+                                              stream=True, session=session)
+        if not self.breaker.allow_request():
+            print("Circuito de Ollama abierto, usando fallback local")
+            return
+        
+        model = payload["model"]
+        final = None
+        cancelled = False
+        generated = []
+        start = time.time()
+        self.router.begin(model)
+        try:
+            with self.client.post("/api/generate", json=payload, timeout=timeout, stream=True) as response:
+                if response.status_code != 200:
+                    print(f"Error de Ollama: {response.status_code} - {response.text}")
+                    return
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if data.get("response"):
+                        generated.append(data["response"])
+                        yield data["response"]
+                    if data.get("done"):
+                        final = data
+                # Se lee hasta agotar el stream (terminador del chunked incluido) para que la
+                # conexión vuelva al pool keep-alive en lugar de cerrarse
+                if final is not None:
+                    if "".join(generated).count("```") % 2 == 1:
+                        # Cerrar el bloque de código cortado por stop o num_predict
+                        yield "\n```"
+                    if result is not None:
+                        result.update(final)
+                    self.profiles.record(question_type, model, payload["options"]["num_predict"], final)
+                    self.telemetry.record(question_type, model, final)
+        except GeneratorExit:
+            # El consumidor cerró el stream (cliente desconectado o flight abandonado)
+            cancelled = True
+            raise
+        except Exception as e:
+            print(f"Error con Ollama (streaming): {e}")
+        finally:
+            # Fallo: error de transporte, timeout, status distinto de 200 o stream sin 'done'.
+            # Un stream cerrado por el consumidor solo libera el lugar de prueba del circuito.
+            if final is not None:
+                self.breaker.record_success(time.time() - start)
+            elif cancelled:
+                self.breaker.record_cancelled()
+            else:
+                self.breaker.record_failure()
+            self.router.end(model, final, time.time() - start)
 
 
 class WebSearcher:
     """Clase para búsqueda web"""
     
     def __init__(self):
+        workers = WEB_SEARCH_CONFIG["fetch_workers"]
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
+        adapter = HTTPAdapter(pool_maxsize=workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
+        # Pool acotado para descargar las páginas de resultados en paralelo
+        self.fetch_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="web-fetch")
+        
+        # Cache en disco de búsquedas y páginas
+        self.cache = WebCache() if WEB_CACHE_CONFIG["enabled"] else None
     
     def is_csharp_related(self, query: str) -> bool:
         """Verificar si la consulta está relacionada con C#"""
@@ -479,38 +834,47 @@ class WebSearcher:
         query_lower = query.lower()
         return any(keyword in query_lower for keyword in csharp_keywords)
     
-    def search_web(self, query: str, max_results: int = 3) -> List[Dict[str, str]]:
-        """Buscar información en la web"""
+    def search_web(self, query: str, max_results: int = 3, deadline: Deadline = None,
+                   cache_only: bool = False) -> List[Dict[str, str]]:
+        """Buscar información en la web (con cache_only, solo lo que ya está en el cache)"""
+        deadline = deadline or Deadline(DEADLINE_CONFIG["max_budget_s"])
+        reserve = DEADLINE_CONFIG["generation_reserve_s"]
         try:
             if not self.is_csharp_related(query):
                 return []
             
-            # Usar DuckDuckGo para búsqueda
-            search_url = "https://html.duckduckgo.com/html/"
-            params = {
-                'q': f"{query} C# .NET site:docs.microsoft.com OR site:learn.microsoft.com"
-            }
-            
-            response = self.session.get(search_url, params=params, timeout=10)
-            response.raise_for_status()
+            timeout = WEB_SEARCH_CONFIG["timeout"]
+            links = self.search_links(query, max_results, deadline.timeout(timeout, reserve), cache_only)
             
-            soup = BeautifulSoup(response.text, 'html.parser')
-            results = []
+            if not links or not deadline.has_time_for(reserve + DEADLINE_CONFIG["min_stage_timeout_s"]):
+                return []
             
-            # Extraer enlaces de resultados
-            links = soup.find_all('a', class_='result__a')
+            if cache_only:
+                # Solo lectura del cache: no compite por el pool con las descargas en segundo plano
+                contents = [self.extract_content_from_url(url, cache_only=True) for _, url in links]
+            else:
+                # Descargar las páginas en paralelo con un plazo común para todas
+                fetch_timeout = deadline.timeout(timeout, reserve)
+                fetch_deadline = Deadline(fetch_timeout)
+                futures = [self.fetch_pool.submit(self.extract_content_from_url, url, fetch_timeout,
+                                                  deadline=fetch_deadline)
+                           for _, url in links]
+                done, pending = wait(futures, timeout=fetch_timeout)
+                for future in pending:
+                    future.cancel()
+                if pending:
+                    print(f"Búsqueda web: {len(pending)} páginas no llegaron a tiempo")
+                contents = [future.result() if future in done else "" for future in futures]
             
-            for link in links[:max_results]:
-                url = link.get('href', '')
-                if url and ('docs.microsoft.com' in url or 'learn.microsoft.com' in url):
-                    title = link.get_text(strip=True)
-                    content = self.extract_content_from_url(url)
-                    if content:
-                        results.append({
-                            'title': title,
-                            'url': url,
-                            'content': content[:500]  # Limitar contenido
-                        })
+            # Lo que terminó a tiempo, en el orden del ranking
+            results = []
+            for (title, url), content in zip(links, contents):
+                if content:
+                    results.append({
+                        'title': title,
+                        'url': url,
+                        'content': content[:500]  # Limitar contenido
+                    })
             
             return results
             
@@ -518,31 +882,98 @@ class WebSearcher:
             print(f"Error en búsqueda web: {e}")
             return []
     
-    def extract_content_from_url(self, url: str) -> str:
-        """Extraer contenido de una URL"""
+    def search_links(self, query: str, max_results: int, timeout: float, cache_only: bool = False) -> List[tuple]:
+        """Enlaces (título, url) de la búsqueda en DuckDuckGo, desde el cache si está disponible"""
+        # La clave es solo la pregunta: el enriquecimiento en segundo plano y la lectura
+        # desde el cache piden distinta cantidad de resultados
+        key = normalize_question(query)
+        if self.cache is not None:
+            cached = self.cache.get_search(key)
+            if cached is not None:
+                return [tuple(link) for link in cached[:max_results]]
+        if cache_only or (self.cache is not None and self.cache.offline):
+            return []
+        
+        # Usar DuckDuckGo para búsqueda
+        search_url = "https://html.duckduckgo.com/html/"
+        params = {
+            'q': f"{query} C# .NET site:docs.microsoft.com OR site:learn.microsoft.com"
+        }
+        
+        response = self.session.get(search_url, params=params, timeout=timeout)
+        response.raise_for_status()
+        
+        soup = BeautifulSoup(response.text, 'html.parser')
+        
+        # Extraer enlaces de resultados
+        links = []
+        for link in soup.find_all('a', class_='result__a')[:max(max_results, WEB_SEARCH_CONFIG["max_results"])]:
+            url = link.get('href', '')
+            if url and ('docs.microsoft.com' in url or 'learn.microsoft.com' in url):
+                links.append((link.get_text(strip=True), url))
+        
+        # Sin enlaces (captcha o página de anomalía con status 200): no cachear, reintentar la próxima vez
+        if self.cache is not None and links:
+            self.cache.put_search(key, links)
+        return links[:max_results]
+    
+    def extract_content_from_url(self, url: str, timeout: float = 10, cache_only: bool = False,
+                                 deadline: Deadline = None) -> str:
+        """Extraer contenido de una URL (cacheado en disco y revalidado con ETag/Last-Modified).
+        
+        timeout es por lectura; deadline corta la descarga completa (la de una página
+        lenta que ya no se va a esperar) para liberar el hilo del pool.
+        """
+        cached = self.cache.get_page(url) if self.cache is not None else None
+        if cached and (cached['fresh'] or cache_only):
+            return cached['content']
+        if cache_only or (self.cache is not None and self.cache.offline):
+            return ""
+        
+        headers = {}
+        if cached:
+            if cached['etag']:
+                headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                headers['If-Modified-Since'] = cached['last_modified']
         try:
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Remover elementos no deseados
-            for element in soup(['script', 'style', 'nav', 'header', 'footer']):
-                element.decompose()
+            # Descarga en streaming: se corta al tope de bytes o al cerrar la región principal
+            if deadline is not None:
+                timeout = deadline.timeout(timeout)
+            with self.session.get(url, timeout=timeout, headers=headers, stream=True) as response:
+                if response.status_code == 304 and cached:
+                    self.cache.revalidated(url)
+                    return cached['content']
+                response.raise_for_status()
+                # Una lectura bloqueada en un host lento se corta cerrando la respuesta al vencer el plazo
+                watchdog = threading.Timer(deadline.remaining(), response.close) if deadline is not None else None
+                if watchdog is not None:
+                    watchdog.daemon = True
+                    watchdog.start()
+                try:
+                    html = read_limited(response.iter_content(chunk_size=16384), WEB_SEARCH_CONFIG["max_page_bytes"],
+                                        deadline)
+                finally:
+                    if watchdog is not None:
+                        watchdog.cancel()
+                if deadline is not None and deadline.expired():
+                    # Página incompleta: no se usa ni se guarda en el cache
+                    print(f"Descarga de {url} cortada por el deadline")
+                    return cached['content'] if cached else ""
             
-            # Extraer texto del contenido principal
-            content = soup.get_text()
+            # Texto del artículo principal, sin recorrer el resto de la página
+            declared = 'charset' in response.headers.get('Content-Type', '').lower()
+            text = extract_text(html, WEB_SEARCH_CONFIG["max_content_chars"],
+                                response.encoding if declared else None)
             
-            # Limpiar y formatear
-            lines = (line.strip() for line in content.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            text = ' '.join(chunk for chunk in chunks if chunk)
-            
-            return text[:1000]  # Limitar a 1000 caracteres
+            if self.cache is not None and text:
+                self.cache.put_page(url, text, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            return text
             
         except Exception as e:
             print(f"Error extrayendo contenido de {url}: {e}")
-            return ""
+            # Si la página no responde, usar la copia vencida del cache
+            return cached['content'] if cached else ""
 
 
 # Función principal para ejecutar el chatbot
@@ -555,9 +986,11 @@ def main():
         
         # Verificar conexión con Ollama
         try:
-            response = requests.get("http://localhost:11434/api/tags", timeout=5)
+            response = get_ollama_client().get("/api/tags", timeout=5)
             if response.status_code == 200:
                 print("✅ Conexión con Ollama establecida")
+                if OLLAMA_CONFIG["warm_up"]:
+                    chatbot.ollama.warm_up()
             else:
                 print("⚠️  Ollama no está respondiendo correctamente")
         except:
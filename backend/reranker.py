@@ -0,0 +1,158 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+
+from config import RERANK_CONFIG, VECTOR_DB_CONFIG
+
+
+class ScoreCache:
+    """Cache LRU thread-safe de (hash de pregunta, id de chunk) -> score"""
+
+    def __init__(self, max_size: int = 2048):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[float]:
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value: float):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class CrossEncoderReranker:
+    """Re-ranking de candidatos con cross-encoder cargado en segundo plano.
+
+    Mientras el modelo no está cargado no se re-rankea (se mantiene el orden
+    por distancia), así la carga nunca cae dentro del presupuesto de un request.
+    """
+
+    def __init__(self, model_name: str = None, config: Dict[str, Any] = None):
+        self.model_name = model_name or VECTOR_DB_CONFIG["cross_encoder_model"]
+        self.config = {**RERANK_CONFIG, **(config or {})}
+        self.cache = ScoreCache(self.config["cache_size"])
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._loader = None
+        # Costo estimado por par (segundos), se ajusta con cada predicción
+        self._seconds_per_pair = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def load_async(self):
+        """Iniciar la carga del cross-encoder en un hilo de fondo (una sola vez)"""
+        with self._load_lock:
+            if self._model is not None or self._loader is not None:
+                return
+            self._loader = threading.Thread(target=self._load, daemon=True, name="cross-encoder-load")
+            self._loader.start()
+
+    def _load(self):
+        try:
+            from sentence_transformers import CrossEncoder
+            print(f"Cargando cross-encoder {self.model_name}...")
+            model = CrossEncoder(self.model_name)
+            self._model = model
+            print(f"Cross-encoder {self.model_name} cargado")
+        except Exception as e:
+            print(f"No se pudo cargar el cross-encoder: {e}")
+            with self._load_lock:
+                self._loader = None  # Reintentar en el próximo request
+
+    @staticmethod
+    def query_hash(query: str) -> str:
+        """Hash estable de la pregunta normalizada"""
+        normalized = " ".join(query.lower().split())
+        return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def chunk_key(chunk: Dict[str, Any]) -> str:
+        """Identificador del chunk (id de Chroma o hash del contenido)"""
+        chunk_id = chunk.get("id")
+        if chunk_id:
+            return chunk_id
+        return hashlib.sha1(chunk.get("content", "").encode("utf-8")).hexdigest()
+
+    def _pairs_within_budget(self, pending: int, budget: float) -> int:
+        """Cantidad de pares que se pueden puntuar sin exceder el presupuesto"""
+        if self._seconds_per_pair is None:
+            # Sin mediciones previas: intentar todos y medir
+            return pending
+        return min(pending, int(budget / self._seconds_per_pair))
+
+    def rerank(self, query: str, chunks: List[Dict[str, Any]],
+               budget_ms: float = None) -> List[Dict[str, Any]]:
+        """Re-ordenar chunks por score del cross-encoder respetando el presupuesto.
+
+        Los chunks sin score (por falta de presupuesto) conservan el orden
+        por distancia detrás de los puntuados.
+        """
+        if not chunks or not self.config["enabled"]:
+            return chunks
+        if not self.loaded:
+            # La carga tarda segundos: no se hace dentro del request
+            self.load_async()
+            return chunks
+
+        start = time.time()
+        budget = (budget_ms if budget_ms is not None else self.config["budget_ms"]) / 1000.0
+        q_hash = self.query_hash(query)
+
+        candidates = sorted(chunks, key=lambda x: x.get("distance", 1.0))
+        candidates = candidates[:self.config["max_candidates"]]
+
+        pending = []
+        for chunk in candidates:
+            score = self.cache.get((q_hash, self.chunk_key(chunk)))
+            if score is None:
+                pending.append(chunk)
+            else:
+                chunk["rerank_score"] = score
+
+        if pending:
+            remaining = budget - (time.time() - start)
+            n_pairs = self._pairs_within_budget(len(pending), remaining) if remaining > 0 else 0
+            if n_pairs < len(pending):
+                print(f"Re-ranking truncado a {n_pairs}/{len(pending)} candidatos por presupuesto")
+            pending = pending[:n_pairs]
+
+        if pending:
+            max_chars = self.config["max_chunk_chars"]
+            pairs = [[query, chunk.get("content", "")[:max_chars]] for chunk in pending]
+            try:
+                model = self._model
+                predict_start = time.time()
+                scores = model.predict(pairs)
+                elapsed = time.time() - predict_start
+                per_pair = elapsed / len(pairs)
+                if self._seconds_per_pair is None:
+                    self._seconds_per_pair = per_pair
+                else:
+                    self._seconds_per_pair = 0.8 * self._seconds_per_pair + 0.2 * per_pair
+                for chunk, score in zip(pending, scores):
+                    score = float(score)
+                    chunk["rerank_score"] = score
+                    self.cache.put((q_hash, self.chunk_key(chunk)), score)
+            except Exception as e:
+                print(f"Error en re-ranking: {e}")
+
+        scored = [c for c in candidates if "rerank_score" in c]
+        unscored = [c for c in chunks if "rerank_score" not in c]
+        scored.sort(key=lambda x: x["rerank_score"], reverse=True)
+        unscored.sort(key=lambda x: x.get("distance", 1.0))
+        return scored + unscored
@@ -0,0 +1,91 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+from admission_control import AdmissionRejected
+from config import SESSION_CONFIG
+
+
+class SessionBusy(AdmissionRejected):
+    """Otro turno de la misma sesión sigue en curso (se responde 409 con Retry-After)"""
+
+    def __init__(self, retry_after_s: int = 1):
+        super().__init__(409, 'La sesión tiene otro turno en curso', retry_after_s)
+
+
+@contextmanager
+def session_turn(session: Dict[str, Any], timeout: float):
+    """Tomar el turno de la sesión esperando como máximo timeout; si no, SessionBusy"""
+    if not session['lock'].acquire(timeout=max(0.0, timeout)):
+        raise SessionBusy()
+    try:
+        yield
+    finally:
+        session['lock'].release()
+
+
+class SessionStore:
+    """Sesiones de conversación en memoria, acotadas por cantidad (LRU) y antigüedad (TTL)"""
+
+    def __init__(self, max_sessions: int = None, ttl_s: float = None):
+        self.max_sessions = max_sessions or SESSION_CONFIG["max_sessions"]
+        self.ttl_s = ttl_s or SESSION_CONFIG["ttl_s"]
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float):
+        # Las sesiones están ordenadas por último uso: las vencidas quedan al principio
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session['updated_at'] <= self.ttl_s:
+                break
+            self._sessions.pop(session_id)
+
+    def get(self, session_id: str) -> Dict[str, Any]:
+        """Obtener la sesión (creándola si no existe o venció) y marcarla como usada"""
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = {
+                    'id': session_id,
+                    'history': [],             # [(pregunta, respuesta)] recortado a max_history_turns
+                    'ollama_context': None,    # Tokens de contexto devueltos por /api/generate
+                    'model': None,             # Modelo que generó ollama_context
+                    'last_embedding': None,
+                    'last_chunks': [],
+                    'last_selected': [],
+                    'last_context': "",
+                    'lock': threading.Lock(),  # Un turno a la vez por sesión
+                    'updated_at': now
+                }
+                self._sessions[session_id] = session
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            session['updated_at'] = now
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def record_turn(self, session: Dict[str, Any], question: str, response: str,
+                    ollama_context: Optional[list] = None, model: str = None):
+        """Guardar el turno.
+
+        El contexto de Ollama solo se reemplaza cuando el turno lo generó el modelo;
+        si supera el tope de tokens se descarta y los turnos previos se envían como
+        texto recortado.
+        """
+        session['history'].append((question, response))
+        session['history'] = session['history'][-SESSION_CONFIG["max_history_turns"]:]
+        if ollama_context is not None:
+            if len(ollama_context) <= SESSION_CONFIG["max_context_tokens"]:
+                session['ollama_context'] = ollama_context
+                session['model'] = model
+            else:
+                session['ollama_context'] = None
+        session['updated_at'] = time.time()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
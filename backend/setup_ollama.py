@@ -9,6 +9,10 @@ import requests
 import time
 import os
 
+from ollama_client import primary_endpoint
+
+OLLAMA_URL = primary_endpoint()
+
 def check_ollama_installed():
     """Verificar si Ollama está instalado"""
     try:
@@ -59,7 +63,7 @@ def install_ollama():
 def check_ollama_running():
     """Verificar si Ollama está ejecutándose"""
     try:
-        response = requests.get("http://localhost:11434/api/tags", timeout=5)
+        response = requests.get(f"{OLLAMA_URL}/api/tags", timeout=5)
         return response.status_code == 200
     except:
         return False
@@ -106,7 +110,7 @@ def test_ollama():
     
     try:
         response = requests.post(
-            "http://localhost:11434/api/generate",
+            f"{OLLAMA_URL}/api/generate",
             json={
                 "model": "llama2",
                 "prompt": "Hola, ¿cómo estás?",
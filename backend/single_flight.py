@@ -0,0 +1,167 @@
+import re
+import threading
+import unicodedata
+from typing import Any, Callable, Dict, Iterator, Tuple
+
+from config import SINGLE_FLIGHT_CONFIG
+
+
+def normalize_question(question: str) -> str:
+    """Clave de la pregunta: minúsculas, sin acentos, sin puntuación y con espacios colapsados"""
+    text = unicodedata.normalize('NFKD', question.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = re.sub(r"[^\w#+.]+", " ", text)
+    return " ".join(text.strip(" .").split())
+
+
+class Flight:
+    """Un request en curso: su resultado o la secuencia de eventos que va produciendo"""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.events = []
+        self.done = False
+        self.result = None
+        self.error = None
+        self.subscribers = 0
+
+    def publish(self, event: Any):
+        with self.cond:
+            self.events.append(event)
+            self.cond.notify_all()
+
+    def finish(self, result: Any = None, error: Exception = None):
+        with self.cond:
+            self.result = result
+            self.error = error
+            self.done = True
+            self.cond.notify_all()
+
+    def wait(self, timeout: float = None) -> bool:
+        with self.cond:
+            return self.cond.wait_for(lambda: self.done, timeout)
+
+    def subscribe(self, timeout: float = None) -> Iterator[Any]:
+        """Eventos publicados desde el principio y los que vayan llegando.
+
+        El suscriptor se cuenta desde esta llamada, antes de empezar a iterar.
+        """
+        with self.cond:
+            self.subscribers += 1
+        return self._events(timeout)
+
+    def _events(self, timeout: float = None) -> Iterator[Any]:
+        index = 0
+        try:
+            while True:
+                with self.cond:
+                    if not self.cond.wait_for(lambda: index < len(self.events) or self.done, timeout):
+                        return
+                    pending = self.events[index:]
+                    finished = self.done
+                index += len(pending)
+                yield from pending
+                if finished and index >= len(self.events):
+                    if self.error is not None:
+                        raise self.error
+                    return
+        finally:
+            with self.cond:
+                self.subscribers -= 1
+
+
+class SingleFlight:
+    """Coalescer requests idénticos en curso: el primero hace el trabajo y los duplicados esperan su resultado"""
+
+    def __init__(self, max_wait_s: float = None):
+        self.max_wait_s = max_wait_s or SINGLE_FLIGHT_CONFIG["max_wait_s"]
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._stats = {'leaders': 0, 'followers': 0, 'in_flight': 0}
+
+    def _join(self, key: Tuple) -> Tuple[Flight, bool]:
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self._stats['followers'] += 1
+                return flight, False
+            flight = Flight()
+            self._flights[key] = flight
+            self._stats['leaders'] += 1
+            self._stats['in_flight'] = len(self._flights)
+            return flight, True
+
+    def _leave(self, key: Tuple, flight: Flight):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            self._stats['in_flight'] = len(self._flights)
+
+    def do(self, key: Tuple, fn: Callable[[], Any], timeout: float = None) -> Tuple[Any, bool]:
+        """Ejecutar fn una sola vez por clave en curso.
+
+        Devuelve (resultado, compartido). Si el resultado del primero no llega a
+        tiempo, el duplicado ejecuta fn por su cuenta.
+        """
+        flight, leader = self._join(key)
+        if leader:
+            try:
+                result = fn()
+            except Exception as e:
+                flight.finish(error=e)
+                raise
+            finally:
+                self._leave(key, flight)
+            flight.finish(result)
+            return result, False
+
+        wait = self.max_wait_s if timeout is None else min(timeout, self.max_wait_s)
+        if not flight.wait(wait):
+            return fn(), False
+        if flight.error is not None:
+            raise flight.error
+        return flight.result, True
+
+    def stream(self, key: Tuple, factory: Callable[[], Iterator[Any]]) -> Iterator[Tuple[Any, bool]]:
+        """Compartir un generador de eventos entre requests idénticos.
+
+        El primero lo ejecuta en un hilo de fondo que publica cada evento; todos
+        (incluido el primero) los leen desde el principio. Si todos los clientes
+        se desconectan, el generador se cierra.
+        """
+        flight, leader = self._join(key)
+        events = flight.subscribe(self.max_wait_s)
+        if leader:
+            threading.Thread(target=self._produce, args=(key, flight, factory), daemon=True,
+                             name="single-flight-stream").start()
+        try:
+            for event in events:
+                yield event, not leader
+        finally:
+            events.close()
+
+    def _produce(self, key: Tuple, flight: Flight, factory: Callable[[], Iterator[Any]]):
+        generator = factory()
+        try:
+            for event in generator:
+                flight.publish(event)
+                with flight.cond:
+                    abandoned = flight.subscribers == 0
+                if abandoned:
+                    generator.close()
+                    break
+        except Exception as e:
+            self._leave(key, flight)
+            flight.finish(error=e)
+            return
+        self._leave(key, flight)
+        flight.finish()
+
+    def in_flight(self, key: Tuple) -> bool:
+        """Hay un request en curso con esta clave (un duplicado no generaría de nuevo)"""
+        with self._lock:
+            return key in self._flights
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
@@ -0,0 +1,70 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError as FutureTimeoutError
+from typing import Dict, Any, Callable, Optional
+
+from config import SPECULATION_CONFIG
+
+
+class StageScheduler:
+    """Ejecuta especulativamente etapas lentas (p. ej. búsqueda web) en paralelo con la recuperación.
+
+    Lleva, por clave (tipo de pregunta), cuántas veces la etapa resultó necesaria
+    para decidir si vale la pena especular, y cuántas especulaciones se aprovecharon.
+    """
+
+    def __init__(self, config: Dict[str, Any] = None):
+        self.config = {**SPECULATION_CONFIG, **(config or {})}
+        self.executor = ThreadPoolExecutor(max_workers=self.config["max_workers"],
+                                           thread_name_prefix="speculative-stage")
+        self._lock = threading.Lock()
+        self._need = {}  # clave -> [veces necesaria, total]
+        self._stats = {'started': 0, 'used': 0, 'discarded': 0, 'not_speculated_needed': 0}
+
+    def should_speculate(self, key: str) -> bool:
+        """Especular si la etapa suele ser necesaria para este tipo de pregunta"""
+        if not self.config["enabled"]:
+            return False
+        with self._lock:
+            needed, total = self._need.get(key, (0, 0))
+        if total < self.config["min_samples"]:
+            return True
+        return needed / total >= self.config["min_need_rate"]
+
+    def start(self, fn: Callable, *args, **kwargs) -> Future:
+        with self._lock:
+            self._stats['started'] += 1
+        return self.executor.submit(fn, *args, **kwargs)
+
+    def resolve(self, key: str, future: Optional[Future], needed: bool, timeout: float = None):
+        """Cerrar la especulación: usar el resultado si la etapa era necesaria o descartarlo"""
+        with self._lock:
+            needed_count, total = self._need.get(key, (0, 0))
+            self._need[key] = (needed_count + int(needed), total + 1)
+            if future is None:
+                if needed:
+                    self._stats['not_speculated_needed'] += 1
+                return None
+            if not needed:
+                self._stats['discarded'] += 1
+            else:
+                self._stats['used'] += 1
+
+        if not needed:
+            # Si no empezó, se cancela; si ya corre, su resultado se ignora
+            future.cancel()
+            return None
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            print("La etapa especulativa no terminó dentro del presupuesto")
+        except Exception as e:
+            print(f"Error en etapa especulativa: {e}")
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            resolved = stats['used'] + stats['discarded']
+            stats['hit_rate'] = round(stats['used'] / resolved, 3) if resolved else None
+            stats['need_rate'] = {key: round(needed / total, 3) for key, (needed, total) in self._need.items() if total}
+        return stats
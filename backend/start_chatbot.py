@@ -9,10 +9,14 @@ import subprocess
 import requests
 import time
 
+from ollama_client import primary_endpoint
+
+OLLAMA_URL = primary_endpoint()
+
 def check_ollama():
     """Verificar si Ollama está ejecutándose"""
     try:
-        response = requests.get("http://localhost:11434/api/tags", timeout=5)
+        response = requests.get(f"{OLLAMA_URL}/api/tags", timeout=5)
         return response.status_code == 200
     except:
         return False
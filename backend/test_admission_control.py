@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la cola acotada delante de la generación (admission_control)
+No necesitan Ollama ni el índice
+"""
+
+import threading
+import time
+
+from admission_control import AdmissionController, AdmissionRejected
+
+
+def new_controller() -> AdmissionController:
+    # Un solo lugar y un solo request en espera; sin shedding temprano
+    return AdmissionController({'max_concurrent': 1, 'max_queue': 1, 'max_queue_wait_s': 5,
+                                'initial_service_s': 0.01, 'shed_factor': 1000})
+
+
+def wait_until(condition, timeout: float = 2.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "Tiempo de espera agotado"
+        time.sleep(0.01)
+
+
+def test_full_queue_rejected():
+    """Con el lugar ocupado y la cola llena, el siguiente request recibe 429 enseguida"""
+    print("🧪 Probando cola llena...")
+    controller = new_controller()
+    running = controller.acquire()
+
+    tickets = []
+    waiter = threading.Thread(target=lambda: tickets.append(controller.acquire()))
+    waiter.start()
+    wait_until(lambda: controller.stats()['queue_depth'] == 1)
+
+    start = time.time()
+    try:
+        controller.acquire()
+        raise AssertionError("Se esperaba AdmissionRejected")
+    except AdmissionRejected as e:
+        assert e.status == 429, f"Status {e.status}"
+        assert e.retry_after_s >= 1
+    assert time.time() - start < 0.5, "El rechazo por cola llena no debe esperar"
+
+    # Al liberar el lugar entra el que esperaba en la cola
+    running.release()
+    waiter.join(2)
+    assert len(tickets) == 1 and tickets[0].wait_s > 0
+    tickets[0].release()
+    stats = controller.stats()
+    assert stats['rejected_full'] == 1 and stats['admitted'] == 2, stats
+    print("✅ 429 con la cola llena y el que esperaba fue admitido")
+
+
+def test_queue_timeout_rejected():
+    """Un request que no consigue lugar a tiempo recibe 503 y sale de la cola"""
+    print("🧪 Probando espera agotada en la cola...")
+    controller = new_controller()
+    running = controller.acquire()
+
+    start = time.time()
+    try:
+        controller.acquire(max_wait_s=0.1)
+        raise AssertionError("Se esperaba AdmissionRejected")
+    except AdmissionRejected as e:
+        assert e.status == 503, f"Status {e.status}"
+    assert time.time() - start >= 0.1
+
+    stats = controller.stats()
+    assert stats['queue_depth'] == 0 and stats['rejected_timeout'] == 1, stats
+
+    # La cola quedó vacía: al liberar, el siguiente entra sin esperar
+    running.release()
+    ticket = controller.acquire(max_wait_s=0.1)
+    assert ticket.wait_s < 0.05
+    ticket.release()
+    assert controller.stats()['in_flight'] == 0
+    print("✅ 503 tras la espera y la cola quedó vacía")
+
+
+def main():
+    print("🧪 Pruebas del control de admisión")
+    print("=" * 50)
+    tests = [test_full_queue_rejected, test_queue_timeout_rejected]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {e}")
+    print(f"\n📊 {passed}/{len(tests)} pruebas pasaron")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    success = main()
+    exit(0 if success else 1)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Pruebas del camino de generación (OllamaLLM) contra el servidor falso de Ollama
+No necesitan Ollama ni modelos descargados
+"""
+
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from fake_ollama import FakeOllamaServer, use_fake
+
+
+@contextmanager
+def fake_server(config: dict):
+    """Servidor falso con el cliente de Ollama apuntado a él y los logs JSONL en un directorio temporal.
+
+    Al salir se restauran OLLAMA_URL/OLLAMA_URLS, el cliente compartido y BACKEND_LOG_DIR.
+    """
+    previous_log_dir = os.environ.get('BACKEND_LOG_DIR')
+    with tempfile.TemporaryDirectory() as directory, FakeOllamaServer(config, port=0) as server:
+        os.environ['BACKEND_LOG_DIR'] = directory
+        use_fake(server)
+        try:
+            yield server
+        finally:
+            if previous_log_dir is None:
+                os.environ.pop('BACKEND_LOG_DIR', None)
+            else:
+                os.environ['BACKEND_LOG_DIR'] = previous_log_dir
+
+
+def new_llm():
+    from rag_chatbot import OllamaLLM
+    return OllamaLLM()
+
+
+def test_generate():
+    """Respuesta completa con las métricas de Ollama"""
+    print("🧪 Probando generate_response...")
+    with fake_server({'ttft_s': 0.05, 'tokens_per_s': 500,
+                      'canned': {'bucle for': 'Usa for (int i = 0; i < 10; i++) { }'}}) as server:
+        llm = new_llm()
+        result = {}
+        response = llm.generate_response("¿Cómo hago un bucle for?", question_type="code_example", result=result)
+        assert 'for (int i = 0' in response, f"Respuesta inesperada: {response!r}"
+        assert result.get('eval_count'), f"Faltan las métricas de Ollama: {result}"
+        print(f"✅ Respuesta: {response}")
+
+
+def test_stream():
+    """Tokens en streaming con los bloques de código balanceados"""
+    print("🧪 Probando generate_stream...")
+    with fake_server({'ttft_s': 0.05, 'tokens_per_s': 500}) as server:
+        llm = new_llm()
+        tokens = list(llm.generate_stream("Hola mundo en C#", question_type="code_example"))
+        text = "".join(tokens)
+        assert len(tokens) >= 2 and text.count("```") % 2 == 0, f"Stream inesperado: {tokens}"
+        print(f"✅ {len(tokens)} tokens recibidos")
+
+
+def test_concurrency():
+    """Con concurrencia 1 en el servidor, los requests simultáneos se encolan"""
+    print("🧪 Probando requests concurrentes...")
+    with fake_server({'ttft_s': 0.1, 'tokens_per_s': 1000, 'concurrency': 1}) as server:
+        llm = new_llm()
+        responses = []
+        threads = [threading.Thread(target=lambda: responses.append(llm.generate_response("hola")))
+                   for _ in range(4)]
+        start = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.time() - start
+        assert len(responses) == 4 and all(responses), f"Respuestas vacías: {responses}"
+        assert server.stats['max_in_flight'] == 1 and elapsed >= 0.4, \
+            f"Concurrencia inesperada: {server.stats}, {elapsed:.2f}s"
+        print(f"✅ 4 requests en {elapsed:.2f}s (cola máxima {server.stats['max_queued']})")
+
+
+def test_circuit_breaker():
+    """Con todos los requests fallando, el circuito se abre y se deja de llamar a Ollama"""
+    print("🧪 Probando circuit breaker...")
+    with fake_server({'error_rate': 1.0}) as server:
+        llm = new_llm()
+        for _ in range(10):
+            assert not llm.generate_response("hola"), "Se esperaba una respuesta vacía"
+        state = llm.breaker.snapshot()['state']
+        sent = server.stats['by_path'].get('/api/generate', 0)
+        assert state == 'open' and sent < 10, f"Estado {state}, {sent} requests enviados"
+        print(f"✅ Circuito {state} tras {sent} fallos")
+
+
+def main():
+    print("🧪 Pruebas con Ollama falso")
+    print("=" * 50)
+    tests = [test_generate, test_stream, test_concurrency, test_circuit_breaker]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {e}")
+    print(f"\n📊 {passed}/{len(tests)} pruebas pasaron")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    success = main()
+    exit(0 if success else 1)
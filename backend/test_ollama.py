@@ -3,15 +3,20 @@
 Script de prueba para verificar que Ollama funciona con CodeHelperNET
 """
 
+import sys
 import requests
 import time
 
+from ollama_client import primary_endpoint
+
+OLLAMA_URL = primary_endpoint()
+
 def test_ollama_connection():
     """Probar conexión con Ollama"""
     print("🔍 Probando conexión con Ollama...")
     
     try:
-        response = requests.get("http://localhost:11434/api/tags", timeout=5)
+        response = requests.get(f"{OLLAMA_URL}/api/tags", timeout=5)
         if response.status_code == 200:
             print("✅ Ollama está ejecutándose")
             return True
@@ -38,7 +43,7 @@ def test_ollama_generation():
         }
         
         response = requests.post(
-            "http://localhost:11434/api/generate",
+            f"{OLLAMA_URL}/api/generate",
             json=payload,
             timeout=30
         )
@@ -91,9 +96,18 @@ def test_chatbot():
 
 def main():
     """Función principal de pruebas"""
+    global OLLAMA_URL
     print("🧪 Pruebas de CodeHelperNET con Ollama")
     print("=" * 50)
     
+    # --fake: usar el servidor falso de Ollama en lugar de uno real
+    if '--fake' in sys.argv:
+        from fake_ollama import FakeOllamaServer, use_fake
+        server = FakeOllamaServer(port=0).start()
+        use_fake(server)
+        OLLAMA_URL = server.url
+        print(f"🤖 Usando Ollama falso en {OLLAMA_URL}")
+    
     # Prueba 1: Conexión con Ollama
     if not test_ollama_connection():
         print("\n💡 Para solucionar:")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la coalescencia de requests idénticos (single_flight)
+No necesitan Ollama ni el índice
+"""
+
+import threading
+import time
+
+from single_flight import SingleFlight
+
+
+def wait_until(condition, timeout: float = 2.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "Tiempo de espera agotado"
+        time.sleep(0.01)
+
+
+def test_do_coalesces():
+    """Un duplicado que llega mientras el primero trabaja recibe el mismo resultado sin repetir fn"""
+    print("🧪 Probando SingleFlight.do...")
+    flight = SingleFlight(max_wait_s=5)
+    key = ('chat', 'como hago un bucle for', 'auto')
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        release.wait(2)
+        return "respuesta"
+
+    results = {}
+    leader = threading.Thread(target=lambda: results.update(leader=flight.do(key, work)))
+    leader.start()
+    wait_until(lambda: flight.in_flight(key))
+    follower = threading.Thread(target=lambda: results.update(follower=flight.do(key, work)))
+    follower.start()
+    wait_until(lambda: flight.stats()['followers'] == 1)
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert results['leader'] == ("respuesta", False), results
+    assert results['follower'] == ("respuesta", True), results
+    assert len(calls) == 1, f"fn se ejecutó {len(calls)} veces"
+    assert not flight.in_flight(key)
+    print("✅ Un solo llamado para dos requests")
+
+
+def test_stream_late_follower():
+    """Un duplicado que se suma a mitad del stream recibe los mismos eventos desde el principio"""
+    print("🧪 Probando SingleFlight.stream con un duplicado tardío...")
+    flight = SingleFlight(max_wait_s=5)
+    key = ('stream', 'hola mundo en c#', 'auto')
+    release = threading.Event()
+    factories = []
+
+    def factory():
+        factories.append(1)
+        yield {'type': 'metadata'}
+        release.wait(2)
+        for token in ("Console", ".WriteLine", "(\"Hola\");"):
+            yield {'type': 'token', 'content': token}
+        yield {'type': 'done'}
+
+    leader = flight.stream(key, factory)
+    first, shared = next(leader)
+    assert first == {'type': 'metadata'} and not shared
+
+    # El primero ya recibió un evento: el duplicado llega tarde
+    follower = flight.stream(key, factory)
+    follower_events = []
+    reader = threading.Thread(target=lambda: follower_events.extend(follower))
+    reader.start()
+    release.set()
+    leader_events = [(first, shared)] + list(leader)
+    reader.join(2)
+
+    assert len(factories) == 1, f"El generador se creó {len(factories)} veces"
+    assert [event for event, _ in leader_events] == [event for event, _ in follower_events], \
+        f"Eventos distintos: {leader_events} vs {follower_events}"
+    assert leader_events[-1][0] == {'type': 'done'}
+    assert all(not shared for _, shared in leader_events)
+    assert all(shared for _, shared in follower_events)
+    wait_until(lambda: not flight.in_flight(key))
+    print(f"✅ {len(leader_events)} eventos idénticos para los dos clientes")
+
+
+def main():
+    print("🧪 Pruebas de single flight")
+    print("=" * 50)
+    tests = [test_do_coalesces, test_stream_late_follower]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {e}")
+    print(f"\n📊 {passed}/{len(tests)} pruebas pasaron")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    success = main()
+    exit(0 if success else 1)
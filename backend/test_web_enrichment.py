@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Pruebas del enriquecimiento web en segundo plano (modo answer_first)
+No usan la red: la sesión HTTP del buscador devuelve páginas fijas
+"""
+
+import os
+import tempfile
+
+from web_cache import WebCache
+from web_enrichment import WebEnricher
+
+QUESTION = "¿Cómo uso LINQ en C#?"
+LINKS = [f"https://learn.microsoft.com/dotnet/csharp/linq/{name}" for name in ("intro", "query", "methods")]
+
+SEARCH_HTML = "<html><body>" + "".join(
+    f'<a class="result__a" href="{url}">LINQ {index}</a>' for index, url in enumerate(LINKS)
+) + "</body></html>"
+
+PAGE_HTML = (b"<html><body><nav>Menu</nav><main><h1>LINQ</h1>"
+             b"<p>Language Integrated Query permite consultar colecciones con from, where y select.</p>"
+             b"</main><footer>Pie</footer></body></html>")
+
+
+class FakeResponse:
+    def __init__(self, text: str = "", content: bytes = b""):
+        self.status_code = 200
+        self.text = text
+        self.content = content
+        self.headers = {'Content-Type': 'text/html; charset=utf-8', 'ETag': '"v1"'}
+        self.encoding = 'utf-8'
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size: int = 1024):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def __enter__(self) -> 'FakeResponse':
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+class FakeSession:
+    """Sesión HTTP falsa: resultados de DuckDuckGo y páginas de learn.microsoft.com"""
+
+    def __init__(self):
+        self.calls = []
+
+    def get(self, url: str, **kwargs) -> FakeResponse:
+        self.calls.append(url)
+        if 'duckduckgo' in url:
+            return FakeResponse(text=SEARCH_HTML)
+        return FakeResponse(content=PAGE_HTML)
+
+
+def new_searcher(path: str):
+    """Buscador con un cache temporal (no el web_cache.sqlite3 del backend) y sin red"""
+    from rag_chatbot import WebSearcher
+    os.environ['WEB_CACHE_PATH'] = path
+    os.environ.pop('WEB_CACHE_OFFLINE', None)
+    searcher = WebSearcher()
+    if searcher.cache is None:
+        searcher.cache = WebCache(path)
+    searcher.session = FakeSession()
+    return searcher
+
+
+def test_enrichment_fills_cache_for_answer_first():
+    """Lo que el enriquecimiento deja en el cache se lee después sin red, con otra cantidad de resultados"""
+    print("🧪 Probando enriquecimiento y lectura desde el cache...")
+    with tempfile.TemporaryDirectory() as directory:
+        searcher = new_searcher(os.path.join(directory, "web_cache.sqlite3"))
+        enricher = WebEnricher(searcher, config={'max_results': 3, 'queue_ingestion': False})
+
+        assert enricher.enrich(QUESTION)
+        enricher.executor.shutdown(wait=True)
+        assert enricher.stats()['completed'] == 1, enricher.stats()
+        assert len(searcher.session.calls) == 1 + len(LINKS), searcher.session.calls
+
+        # El camino de answer_first: solo cache, menos resultados y sin tocar la red
+        searcher.session = FakeSession()
+        results = searcher.search_web(QUESTION, max_results=2, cache_only=True)
+        assert [result['url'] for result in results] == LINKS[:2], results
+        assert all('Language Integrated Query' in result['content'] for result in results)
+        assert 'Menu' not in results[0]['content'] and 'Pie' not in results[0]['content']
+        assert searcher.session.calls == [], f"Llamadas a la red: {searcher.session.calls}"
+        searcher.cache.conn.close()
+        os.environ.pop('WEB_CACHE_PATH', None)
+        print(f"✅ {len(results)} páginas desde el cache sin llamadas a la red")
+
+
+def main():
+    print("🧪 Pruebas de enriquecimiento web")
+    print("=" * 50)
+    tests = [test_enrichment_fills_cache_for_answer_first]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {e}")
+    print(f"\n📊 {passed}/{len(tests)} pruebas pasaron")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    success = main()
+    exit(0 if success else 1)
@@ -0,0 +1,139 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+from config import WEB_CACHE_CONFIG
+
+
+def cache_path() -> str:
+    path = os.environ.get('WEB_CACHE_PATH') or WEB_CACHE_CONFIG["path"]
+    if not os.path.isabs(path):
+        path = os.path.join(os.path.dirname(__file__), path)
+    return path
+
+
+class WebCache:
+    """Cache en SQLite de búsquedas web (lista de enlaces) y del texto extraído de cada página.
+
+    Las entradas vencidas se revalidan con ETag/Last-Modified; al superar
+    max_bytes se eliminan las menos usadas. En modo offline solo se responde
+    desde el cache (para pruebas reproducibles sin red).
+    """
+
+    def __init__(self, path: str = None, config: Dict[str, Any] = None):
+        self.config = {**WEB_CACHE_CONFIG, **(config or {})}
+        self.offline = self.config["offline"] or os.environ.get('WEB_CACHE_OFFLINE') == '1'
+        self._lock = threading.Lock()
+        self._stats = {'search_hits': 0, 'search_misses': 0, 'page_hits': 0, 'page_misses': 0,
+                       'revalidated': 0, 'evicted': 0}
+        self.conn = sqlite3.connect(path or cache_path(), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS searches (
+                query TEXT PRIMARY KEY,
+                results TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                content TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+        """)
+        self.conn.commit()
+
+    def get_search(self, query: str) -> Optional[List[Dict[str, str]]]:
+        """Enlaces cacheados para la consulta si no vencieron (en offline, aunque hayan vencido)"""
+        with self._lock:
+            row = self.conn.execute("SELECT results, stored_at FROM searches WHERE query = ?", (query,)).fetchone()
+            if row is None or (not self.offline and time.time() - row[1] > self.config["search_ttl_s"]):
+                self._stats['search_misses'] += 1
+                return None
+            self.conn.execute("UPDATE searches SET accessed_at = ? WHERE query = ?", (time.time(), query))
+            self.conn.commit()
+            self._stats['search_hits'] += 1
+            return json.loads(row[0])
+
+    def put_search(self, query: str, results: List[Dict[str, str]]):
+        """Guardar los enlaces de la consulta; una lista vacía no se guarda (se reintenta la búsqueda)"""
+        if not results:
+            return
+        data = json.dumps(results, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self.conn.execute("INSERT OR REPLACE INTO searches VALUES (?, ?, ?, ?, ?)",
+                              (query, data, len(data.encode('utf-8')), now, now))
+            self.conn.commit()
+        self.evict()
+
+    def get_page(self, url: str) -> Optional[Dict[str, Any]]:
+        """Entrada de la página con 'fresh' indicando si puede usarse sin revalidar"""
+        with self._lock:
+            row = self.conn.execute("SELECT content, etag, last_modified, stored_at FROM pages WHERE url = ?",
+                                    (url,)).fetchone()
+            if row is None:
+                self._stats['page_misses'] += 1
+                return None
+            self.conn.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (time.time(), url))
+            self.conn.commit()
+            fresh = self.offline or time.time() - row[3] <= self.config["page_ttl_s"]
+            self._stats['page_hits' if fresh else 'page_misses'] += 1
+            return {'content': row[0], 'etag': row[1], 'last_modified': row[2], 'fresh': fresh}
+
+    def put_page(self, url: str, content: str, etag: str = None, last_modified: str = None):
+        now = time.time()
+        with self._lock:
+            self.conn.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                              (url, content, etag, last_modified, len(content.encode('utf-8')), now, now))
+            self.conn.commit()
+        self.evict()
+
+    def revalidated(self, url: str):
+        """La página no cambió (304): renovar su TTL"""
+        with self._lock:
+            self.conn.execute("UPDATE pages SET stored_at = ? WHERE url = ?", (time.time(), url))
+            self.conn.commit()
+            self._stats['revalidated'] += 1
+
+    def size_bytes(self) -> int:
+        with self._lock:
+            return self._size()
+
+    def _size(self) -> int:
+        searches = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM searches").fetchone()[0]
+        pages = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        return searches + pages
+
+    def evict(self):
+        """Eliminar las entradas menos usadas hasta quedar bajo max_bytes"""
+        with self._lock:
+            excess = self._size() - self.config["max_bytes"]
+            if excess <= 0:
+                return
+            rows = self.conn.execute("""
+                SELECT 'searches', query, size, accessed_at FROM searches
+                UNION ALL
+                SELECT 'pages', url, size, accessed_at FROM pages
+                ORDER BY accessed_at
+            """).fetchall()
+            for table, key, size, _ in rows:
+                if excess <= 0:
+                    break
+                column = 'query' if table == 'searches' else 'url'
+                self.conn.execute(f"DELETE FROM {table} WHERE {column} = ?", (key,))
+                excess -= size
+                self._stats['evicted'] += 1
+            self.conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, 'size_bytes': self._size(), 'offline': self.offline}
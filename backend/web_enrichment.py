@@ -0,0 +1,103 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List
+
+from config import WEB_ENRICHMENT_CONFIG, DEADLINE_CONFIG
+from deadline import Deadline
+from single_flight import normalize_question
+
+
+def pending_path() -> str:
+    path = WEB_ENRICHMENT_CONFIG["pending_ingestion_file"]
+    if not os.path.isabs(path):
+        path = os.path.join(os.path.dirname(__file__), path)
+    return path
+
+
+class WebEnricher:
+    """Búsqueda web fuera del camino crítico.
+
+    La respuesta se da con el contexto local y la búsqueda corre en segundo
+    plano: las páginas quedan en el cache web (la próxima pregunta igual las
+    usa sin esperar) y, opcionalmente, en una cola de ingesta pendiente para
+    agregarlas al índice.
+    """
+
+    def __init__(self, web_searcher, config: Dict[str, Any] = None):
+        self.web_searcher = web_searcher
+        self.config = {**WEB_ENRICHMENT_CONFIG, **(config or {})}
+        self.executor = ThreadPoolExecutor(max_workers=self.config["max_workers"],
+                                           thread_name_prefix="web-enrichment")
+        self._lock = threading.Lock()
+        self._in_progress = set()
+        self._queued_urls = self._load_queued_urls()
+        self._stats = {'scheduled': 0, 'skipped': 0, 'completed': 0, 'empty': 0, 'queued_for_ingestion': 0}
+
+    def _load_queued_urls(self) -> set:
+        """URLs ya encoladas para ingesta (para no repetirlas entre reinicios)"""
+        urls = set()
+        if self.config["queue_ingestion"] and os.path.exists(pending_path()):
+            with open(pending_path(), 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        urls.add(json.loads(line)['url'])
+                    except (ValueError, KeyError):
+                        continue
+        return urls
+
+    def enrich(self, question: str) -> bool:
+        """Programar la búsqueda web de la pregunta; False si ya está en curso o la cola está llena"""
+        key = normalize_question(question)
+        with self._lock:
+            if key in self._in_progress or len(self._in_progress) >= self.config["max_pending"]:
+                self._stats['skipped'] += 1
+                return False
+            self._in_progress.add(key)
+            self._stats['scheduled'] += 1
+        self.executor.submit(self._run, key, question)
+        return True
+
+    def _run(self, key: str, question: str):
+        try:
+            deadline = Deadline(DEADLINE_CONFIG["max_budget_s"])
+            results = self.web_searcher.search_web(question, max_results=self.config["max_results"],
+                                                   deadline=deadline)
+            with self._lock:
+                self._stats['completed' if results else 'empty'] += 1
+            if results:
+                print(f"Enriquecimiento web listo para '{question[:60]}': {len(results)} páginas en cache")
+                if self.config["queue_ingestion"]:
+                    self._queue_for_ingestion(question, results)
+        except Exception as e:
+            print(f"Error en enriquecimiento web: {e}")
+        finally:
+            with self._lock:
+                self._in_progress.discard(key)
+
+    def _queue_for_ingestion(self, question: str, results: List[Dict[str, str]]):
+        """Agregar las páginas nuevas a la cola de ingesta pendiente (JSONL)"""
+        with self._lock:
+            new = [result for result in results if result['url'] not in self._queued_urls]
+            if not new:
+                return
+            try:
+                with open(pending_path(), 'a', encoding='utf-8') as f:
+                    for result in new:
+                        f.write(json.dumps({
+                            'timestamp': time.time(),
+                            'question': question,
+                            'url': result['url'],
+                            'title': result['title'],
+                            'content': result['content']
+                        }, ensure_ascii=False) + "\n")
+                        self._queued_urls.add(result['url'])
+                self._stats['queued_for_ingestion'] += len(new)
+            except Exception as e:
+                print(f"Error guardando la cola de ingesta: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, 'in_progress': len(self._in_progress)}
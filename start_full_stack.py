@@ -11,10 +11,15 @@ import requests
 import threading
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+from ollama_client import ollama_endpoints
+
+OLLAMA_URLS = ollama_endpoints()
+
 def check_ollama():
     """Verificar si Ollama está ejecutándose"""
     try:
-        response = requests.get("http://localhost:11434/api/tags", timeout=5)
+        response = requests.get(f"{OLLAMA_URLS[0]}/api/tags", timeout=5)
         return response.status_code == 200
     except:
         return False
@@ -173,7 +178,7 @@ def main():
     print("\n🎉 ¡CodeHelperNET está listo!")
     print("📱 Frontend: http://localhost:3000")
     print("🔧 Backend: http://localhost:5000")
-    print("🤖 Ollama: http://localhost:11434")
+    print(f"🤖 Ollama: {', '.join(OLLAMA_URLS)}")
     
     # Monitorear procesos
     monitor_processes(backend_process, frontend_process)